@@ -1,4 +1,8 @@
 import json
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
 
 # Tus campos seleccionados
 campos_deseados = {
@@ -12,24 +16,98 @@ campos_deseados = {
     #'title_without_series'
 }
 
-data_simplificada = []
 
+def dividir_rangos(ruta, partes):
+    """Divide el archivo en rangos de bytes [inicio, fin) de tamaño parecido."""
+    tamano = os.path.getsize(ruta)
+    paso = max(1, -(-tamano // partes))
+    return [(inicio, min(inicio + paso, tamano)) for inicio in range(0, tamano, paso)]
 
-# Abrimos el original para leer línea a línea
-with open('archivo.json', 'r', encoding='utf-8') as f:
-    for linea in f:
-        linea = linea.strip()
+
+def lineas_rango(f, inicio, fin):
+    """
+    Líneas cuyo primer byte está en [inicio, fin).
+    La línea que empieza antes de inicio la procesa el rango anterior.
+    """
+    if inicio > 0:
+        f.seek(inicio - 1)
+        f.readline()
+    else:
+        f.seek(0)
+    while f.tell() < fin:
+        linea = f.readline()
         if not linea:
-            continue
-            
-        try:
-            item = json.loads(linea)
-            filtrado = {k: item[k] for k in campos_deseados if k in item}
-            data_simplificada.append(filtrado)
-            
-        except json.JSONDecodeError:
-            continue
-
-
-with open('archivo_final_limpio.json', 'w', encoding='utf-8') as f:
-    json.dump(data_simplificada, f, ensure_ascii=False, indent=4)
+            break
+        yield linea
+
+
+def unir_partes(rutas_partes, salida):
+    """Concatena en orden los archivos parciales en salida y los borra."""
+    with open(salida, 'wb') as destino:
+        for ruta_parte in rutas_partes:
+            with open(ruta_parte, 'rb') as parte:
+                shutil.copyfileobj(parte, destino)
+            os.remove(ruta_parte)
+
+
+def _proyectar_rango(ruta, inicio, fin, campos, ruta_parte):
+    """Proyecta los campos de un rango del JSONL y los escribe en un archivo parcial."""
+    campos = sorted(campos)
+    leidos = escritos = errores = 0
+
+    with open(ruta, 'rb') as f, open(ruta_parte, 'w', encoding='utf-8') as salida:
+        for linea in lineas_rango(f, inicio, fin):
+            linea = linea.strip()
+            if not linea:
+                continue
+            leidos += 1
+
+            try:
+                item = json.loads(linea)
+            except json.JSONDecodeError:
+                errores += 1
+                continue
+
+            filtrado = {k: item[k] for k in campos if k in item}
+            salida.write(json.dumps(filtrado, ensure_ascii=False))
+            salida.write("\n")
+            escritos += 1
+
+    return leidos, escritos, errores
+
+
+def proyectar_jsonl(entrada, salida, campos=campos_deseados, procesos=None, partes=None):
+    """
+    Copia de entrada a salida (JSONL, un libro por línea) solo los campos elegidos.
+
+    - El archivo se divide en rangos de bytes que procesa un pool de procesos
+    - Cada proceso escribe su parte en streaming; al final se concatenan en orden
+    - Devuelve estadísticas de la ejecución, incluido el rendimiento en registros/s
+    """
+    procesos = procesos or os.cpu_count() or 1
+    rangos = dividir_rangos(entrada, partes or procesos * 4)
+    rutas_partes = [f"{salida}.parte{i}" for i in range(len(rangos))]
+
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        futuros = [pool.submit(_proyectar_rango, entrada, inicio, fin, campos, ruta_parte)
+                   for (inicio, fin), ruta_parte in zip(rangos, rutas_partes)]
+        resultados = [futuro.result() for futuro in futuros]
+
+    unir_partes(rutas_partes, salida)
+    segundos = time.perf_counter() - t0
+
+    leidos = sum(r[0] for r in resultados)
+    return {
+        'leidos': leidos,
+        'escritos': sum(r[1] for r in resultados),
+        'errores': sum(r[2] for r in resultados),
+        'segundos': segundos,
+        'registros_por_segundo': leidos / segundos if segundos > 0 else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    stats = proyectar_jsonl('archivo.json', 'archivo_final_limpio.jsonl')
+    print(f"{stats['escritos']} libros escritos ({stats['errores']} líneas inválidas) "
+          f"en {stats['segundos']:.2f} s: {stats['registros_por_segundo']:.0f} registros/s")
@@ -0,0 +1,319 @@
+import argparse
+import contextlib
+import importlib
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+RAIZ = os.path.dirname(os.path.abspath(__file__))
+DEMO4 = os.path.join(RAIZ, "demo4")
+
+TAMANOS = [1_000, 10_000, 100_000, 1_000_000, 10_000_000]
+
+# Marca de etapa no ejecutada (None es un resultado válido de muchas etapas)
+OMITIDO = object()
+
+
+# ============================================================================
+# GENERADORES
+# ============================================================================
+
+def generar_arbol(nodos, fan_out=4, profundidad=8, semilla=0):
+    """
+    Árbol aleatorio como arrays (padre, nivel), padre[0] = -1.
+    Se reparte en anchura: cada nodo recibe entre 1 y 2*fan_out-1 hijos mientras su
+    nivel sea menor que profundidad; si se agotan, se vuelve a dar hijos a los ya
+    expandidos hasta llegar a nodos.
+    """
+    rng = random.Random(semilla)
+    padre, nivel = [-1], [0]
+    abiertos = [0] if profundidad > 0 else []
+    i = 0
+    while len(padre) < nodos and abiertos:
+        if i == len(abiertos):
+            i = 0
+        p = abiertos[i]
+        i += 1
+        for _ in range(rng.randint(1, 2 * fan_out - 1)):
+            if len(padre) >= nodos:
+                break
+            padre.append(p)
+            nivel.append(nivel[p] + 1)
+            if nivel[p] + 1 < profundidad:
+                abiertos.append(len(padre) - 1)
+    return np.array(padre, dtype=np.int64), np.array(nivel, dtype=np.int64)
+
+
+def _hijos_csr(padre):
+    """Hijos de cada nodo en CSR (en orden de id) a partir del array de padres."""
+    n = len(padre)
+    orden = np.argsort(padre[1:], kind="stable") + 1
+    inicio = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(padre[1:], minlength=n), out=inicio[1:])
+    return inicio, orden
+
+
+def _hojas(padre):
+    return np.flatnonzero(np.bincount(padre[1:], minlength=len(padre)) == 0)
+
+
+def _escribir_lineas(f, lineas, bloque=100000):
+    pendiente = []
+    for linea in lineas:
+        pendiente.append(linea)
+        if len(pendiente) >= bloque:
+            f.write("\n".join(pendiente) + "\n")
+            pendiente = []
+    if pendiente:
+        f.write("\n".join(pendiente) + "\n")
+
+
+def generar_taxonomia(ruta, nodos, fan_out=4, profundidad=8, referencias=100, repetidos=0, semilla=0):
+    """
+    Escribe una taxonomía indentada (4 espacios por nivel) con el formato de entrada.txt.
+
+    - repetidos: hojas que aparecen también bajo otro nodo del mismo nivel que su padre,
+      marcadas con "**" como "Historical mystery" en entrada.txt
+    - referencias: pares de hojas distintas para las versiones con referencias
+    Devuelve {'nodos', 'referencias', 'likes'} (likes aleatorios por hoja, para la versión 4).
+    """
+    rng = random.Random(semilla + 1)
+    padre, nivel = generar_arbol(nodos, fan_out, profundidad, semilla)
+    inicio, hijos = _hijos_csr(padre)
+    nombres = [f"Genero {i}" for i in range(len(padre))]
+    hojas = _hojas(padre).tolist()
+
+    extra = {}
+    por_nivel = {}
+    for i, nv in enumerate(nivel.tolist()):
+        por_nivel.setdefault(nv, []).append(i)
+    for h in rng.sample(hojas, min(repetidos, len(hojas))):
+        candidatos = por_nivel.get(int(nivel[h]) - 1, [])
+        if len(candidatos) > 1:
+            q = rng.choice(candidatos)
+            if q != padre[h]:
+                extra.setdefault(q, []).append(h)
+
+    def lineas():
+        pila = [(0, False)]
+        while pila:
+            v, repetido = pila.pop()
+            yield "    " * int(nivel[v]) + nombres[v] + ("   **" if repetido else "")
+            if repetido:
+                continue
+            for h in reversed(extra.get(v, [])):
+                pila.append((h, True))
+            for h in hijos[inicio[v]:inicio[v + 1]][::-1].tolist():
+                pila.append((h, False))
+
+    with open(ruta, "w", encoding="utf-8") as f:
+        _escribir_lineas(f, lineas())
+
+    pares = []
+    while len(hojas) > 1 and len(pares) < referencias:
+        a, b = rng.sample(hojas, 2)
+        pares.append((nombres[a], nombres[b]))
+    likes = {nombres[h]: rng.randint(1, 1000) for h in hojas}
+    return {'nodos': len(padre), 'referencias': pares, 'likes': likes}
+
+
+def generar_aristas(ruta, nodos, fan_out=4, profundidad=8, referencias=100, semilla=0):
+    """
+    Escribe una lista de aristas con el formato de demo4/entrada.txt: "nodos aristas" y una
+    línea "padre hijo" por arista, con ids desde 1.
+    Devuelve {'nodos', 'referencias'} con pares (hoja, hoja) como los de demov4.
+    """
+    rng = random.Random(semilla + 1)
+    padre, _ = generar_arbol(nodos, fan_out, profundidad, semilla)
+    with open(ruta, "w", encoding="utf-8") as f:
+        f.write(f"{len(padre)} {len(padre) - 1}\n")
+        _escribir_lineas(f, (f"{p + 1} {h + 1}" for h, p in enumerate(padre.tolist()) if p >= 0))
+
+    hojas = (_hojas(padre) + 1).tolist()
+    pares = []
+    while len(hojas) > 1 and len(pares) < referencias:
+        pares.append(tuple(rng.sample(hojas, 2)))
+    return {'nodos': len(padre), 'referencias': pares}
+
+
+# ============================================================================
+# MEDICIÓN
+# ============================================================================
+
+class Medidor:
+    """
+    Cronometra etapas y escribe una línea JSON por etapa y tamaño.
+    Si el tiempo de una etapa, extrapolado linealmente desde el tamaño anterior,
+    supera limite_segundos, la etapa se omite (y con ella las que dependen de ella).
+    """
+
+    def __init__(self, salida, limite_segundos=120.0, comun=None):
+        self.salida = salida
+        self.limite = limite_segundos
+        self.comun = comun or {}
+        self.ultimos = {}
+
+    def medir(self, tamano, etapa, funcion, *args, requiere=(), **kwargs):
+        registro = dict(self.comun, tamano=tamano, etapa=etapa)
+        previo = self.ultimos.get(etapa)
+        if any(r is OMITIDO for r in requiere):
+            registro['omitido'] = "falta una etapa anterior"
+        elif previo and previo[1] * tamano / previo[0] > self.limite:
+            registro['omitido'] = f"proyección {previo[1] * tamano / previo[0]:.0f} s > {self.limite:.0f} s"
+        if 'omitido' in registro:
+            self._escribir(registro)
+            return OMITIDO
+
+        t0 = time.perf_counter()
+        resultado = funcion(*args, **kwargs)
+        segundos = time.perf_counter() - t0
+        self.ultimos[etapa] = (tamano, segundos)
+        registro['segundos'] = segundos
+        self._escribir(registro)
+        return resultado
+
+    def _escribir(self, registro):
+        self.salida.write(json.dumps(registro, ensure_ascii=False) + "\n")
+        self.salida.flush()
+        estado = f"{registro['segundos']:.3f} s" if 'segundos' in registro else f"omitido ({registro['omitido']})"
+        print(f"{registro['tamano']:>10} {registro['etapa']:<32} {estado}", file=sys.stderr)
+
+
+def _cargar_demo4():
+    """
+    Módulos de demo4 (lector_aristas, imprimir_aristas, validador, demov4).
+    Sus nombres no chocan con los de la raíz: basta con añadir demo4 a la ruta de búsqueda.
+    """
+    if DEMO4 not in sys.path:
+        sys.path.append(DEMO4)
+    return [importlib.import_module(m) for m in ("lector_aristas", "imprimir_aristas", "validador", "demov4")]
+
+
+@contextlib.contextmanager
+def _silencio():
+    """Descarta lo que las etapas escriben por pantalla."""
+    with open(os.devnull, "w", encoding="utf-8") as nulo, contextlib.redirect_stdout(nulo):
+        yield
+
+
+def _etapas_taxonomia(medidor, tamano, directorio, fan_out, profundidad, referencias):
+    from lector import leer_arrays, grafo_desde_compilado
+    from indice_arbol import indice_de
+    from imprimir import imprimir_arbol_con_pesos
+    from generaHTML import exportar_html
+    from motor_pagerank import diferencia_maxima, diferencia_l1, MOTORES, TOLERANCIA_NX
+    import demov5
+
+    ruta = os.path.join(directorio, "taxonomia.txt")
+    medir = medidor.medir
+    gen = medir(tamano, "generar_taxonomia", generar_taxonomia, ruta, tamano, fan_out, profundidad,
+                referencias, repetidos=max(1, tamano // 1000))
+    datos = medir(tamano, "leer_entrada/parseo", leer_arrays, ruta, cache=False, requiere=(gen,))
+    G = medir(tamano, "leer_entrada/grafo", grafo_desde_compilado, datos, requiere=(datos,))
+    medir(tamano, "indice_arbol", indice_de, G, requiere=(G,))
+
+    refs = gen['referencias'] if gen is not OMITIDO else []
+    likes = gen['likes'] if gen is not OMITIDO else {}
+    pr = {}
+    for motor in MOTORES + ("networkx",):
+        pr[motor] = (
+            medir(tamano, f"version1/{motor}", demov5.version1_sin_pesos, G, motor=motor, requiere=(G,)),
+            medir(tamano, f"version3/{motor}", demov5.version3_con_referencias_y_pesos, G, refs, motor=motor,
+                  requiere=(G,)),
+            medir(tamano, f"version4/{motor}", demov5.version4_personalizacion_likes, G, likes, refs, motor=motor,
+                  requiere=(G,)),
+        )
+
+    # El motor CSR hace las mismas iteraciones que nx.pagerank: tiene que dar los mismos scores.
+    # Los demás (solver exacto, Gauss-Seidel, extrapolación) paran por otro camino: se les pide
+    # quedar dentro de la cota de parada de nx.pagerank, n * tol en norma L1
+    for motor in MOTORES:
+        for version, pr_motor, pr_nx in zip(("version1", "version3", "version4"), pr[motor], pr["networkx"]):
+            if pr_motor is OMITIDO or pr_nx is OMITIDO:
+                continue
+            if motor == "csr":
+                diferencia, cota = diferencia_maxima(pr_motor, pr_nx), TOLERANCIA_NX
+            else:
+                diferencia, cota = diferencia_l1(pr_motor, pr_nx), len(pr_nx) * TOLERANCIA_NX
+            if diferencia > cota:
+                raise RuntimeError(f"{version}: el motor {motor} difiere de nx.pagerank en {diferencia:.2e} "
+                                   f"(cota {cota:.1e}, tamaño {tamano}).")
+
+    pr1, pr3, pr4 = pr["csr"]
+    with open(os.devnull, "w", encoding="utf-8") as nulo:
+        medir(tamano, "imprimir_arbol_con_pesos", imprimir_arbol_con_pesos, G, pr1, "benchmark", salida=nulo,
+              requiere=(G, pr1))
+    with _silencio():
+        for modo in ("estatico", "virtual"):
+            medir(tamano, f"exportar_html/{modo}", exportar_html, G, pr1, pr3, pr4,
+                  os.path.join(directorio, f"{modo}.html"), modo=modo, requiere=(G, pr1, pr3, pr4))
+
+
+def _etapas_demo4(medidor, tamano, directorio, fan_out, profundidad, referencias):
+    lector4, imprimir4, validador4, demov4 = _cargar_demo4()
+    ruta = os.path.join(directorio, "aristas.txt")
+    medir = medidor.medir
+
+    gen = medir(tamano, "demo4/generar_aristas", generar_aristas, ruta, tamano, fan_out, profundidad, referencias)
+    medir(tamano, "demo4/leer_aristas", lector4.leer_aristas, ruta, 0, cache=False, requiere=(gen,))
+    medir(tamano, "demo4/validar_archivo", validador4.validar_archivo, ruta, cache=False, requiere=(gen,))
+    G = medir(tamano, "demo4/leer_entrada", lector4.leer_entrada, ruta, 0, cache=False, requiere=(gen,))
+    refs = gen['referencias'] if gen is not OMITIDO else []
+    if G is not OMITIDO:
+        G.add_edges_from(refs)
+
+    fase1 = medir(tamano, "demo4/fase1", demov4.fase1_pagerank_referencias, G, refs, requiere=(G,))
+    if fase1 is not OMITIDO:
+        pr_refs, nodos_refs = fase1
+        medir(tamano, "demo4/fase2", demov4.fase2_pagerank_arbol_completo, G, refs, nodos_refs, pr_refs,
+              requiere=(G,))
+    medir(tamano, "demo4/dos_fases_barrido", demov4.algoritmo_dos_fases_completo, G, refs, barrido=True,
+          requiere=(G,))
+    pr = medir(tamano, "demo4/pagerank", demov4.nx.pagerank, G, requiere=(G,))
+    with _silencio():
+        medir(tamano, "demo4/imprime_grafo", imprimir4.imprime_grafo, G, pr, requiere=(G, pr))
+
+
+def benchmark(salida="benchmark_escala.jsonl", tamanos=TAMANOS, fan_out=4, profundidad=8, referencias=100,
+              limite_segundos=120.0):
+    """
+    Genera entradas sintéticas de cada tamaño y cronometra todas las etapas de demov5 y demo4.
+    Los resultados se añaden a salida como JSON lines (una línea por etapa y tamaño).
+    """
+    comun = {
+        'fecha': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'python': platform.python_version(),
+        'maquina': platform.node(),
+        'fan_out': fan_out,
+        'profundidad': profundidad,
+        'referencias': referencias,
+    }
+    with open(salida, "a", encoding="utf-8") as f:
+        medidor = Medidor(f, limite_segundos, comun)
+        for tamano in tamanos:
+            directorio = tempfile.mkdtemp(prefix="benchmark_escala_")
+            try:
+                _etapas_taxonomia(medidor, tamano, directorio, fan_out, profundidad, referencias)
+                _etapas_demo4(medidor, tamano, directorio, fan_out, profundidad, referencias)
+            finally:
+                shutil.rmtree(directorio, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de escalado con taxonomías sintéticas")
+    parser.add_argument("--salida", default="benchmark_escala.jsonl")
+    parser.add_argument("--tamanos", type=int, nargs="+", default=TAMANOS)
+    parser.add_argument("--fan-out", type=int, default=4)
+    parser.add_argument("--profundidad", type=int, default=8)
+    parser.add_argument("--referencias", type=int, default=100)
+    parser.add_argument("--limite", type=float, default=120.0,
+                        help="segundos máximos estimados por etapa antes de omitirla")
+    args = parser.parse_args()
+    benchmark(args.salida, args.tamanos, args.fan_out, args.profundidad, args.referencias, args.limite)
@@ -0,0 +1,184 @@
+import hashlib
+import os
+from collections import OrderedDict
+
+import networkx as nx
+import numpy as np
+
+from grafo_compilado import codificar_nombres, decodificar_nombres, _guardar
+from instrumentacion import contar, etapa, registrar_calculo
+
+# Cambiar si cambia lo que se guarda, para no reutilizar resultados antiguos
+VERSION_CACHE = 1
+
+
+def _hash_nodos(h, nodos):
+    h.update(codificar_nombres([repr(n) for n in nodos]).tobytes())
+
+
+def huella_personalizacion(personalization, nodos=None):
+    """
+    Hash del vector de personalización (diccionario o array); None es la uniforme.
+    Sin nodos, los de un diccionario (ordenados por repr) entran también en el hash.
+    """
+    if personalization is None:
+        return "uniforme"
+    h = hashlib.sha1()
+    if isinstance(personalization, dict):
+        if nodos is None:
+            nodos = sorted(personalization, key=repr)
+            _hash_nodos(h, nodos)
+        vector = np.fromiter((personalization.get(n, 0) for n in nodos), dtype=np.float64, count=len(nodos))
+    else:
+        vector = np.asarray(personalization, dtype=np.float64)
+    total = vector.sum()
+    h.update((vector / total if total else vector).tobytes())
+    return h.hexdigest()
+
+
+def huella_matriz(nodos, PT):
+    """Hash de la estructura y los pesos de PT y del orden de los nodos; O(nnz), calcular una vez."""
+    h = hashlib.sha1(f"{PT.shape}".encode())
+    _hash_nodos(h, nodos)
+    for array in (PT.indptr, PT.indices, PT.data):
+        h.update(np.ascontiguousarray(array).tobytes())
+    return h.hexdigest()
+
+
+def clave_matriz(nodos, PT, alpha, personalization=None, tol=1.0e-6, max_iter=100, motor="csr"):
+    """
+    Clave de un cálculo sobre una matriz ya preparada (motor_pagerank.preparar_aristas):
+    estructura y pesos de PT, orden de los nodos, alpha, tolerancia y personalización.
+    """
+    h = hashlib.sha1(f"{VERSION_CACHE}:{motor}:{alpha!r}:{tol!r}:{max_iter}".encode())
+    h.update(huella_matriz(nodos, PT).encode())
+    h.update(huella_personalizacion(personalization, nodos).encode())
+    return h.hexdigest()
+
+
+def clave_digrafo(G, alpha=0.85, personalization=None, weight='weight', **parametros):
+    """Clave de nx.pagerank(G, ...) a partir de nodos, aristas y pesos del grafo."""
+    h = hashlib.sha1(f"{VERSION_CACHE}:networkx:{alpha!r}:{weight}:{sorted(parametros.items())!r}".encode())
+    nodos = list(G.nodes())
+    _hash_nodos(h, nodos)
+    indice = {n: i for i, n in enumerate(nodos)}
+    aristas = np.array([(indice[u], indice[v], d.get(weight, 1.0) if weight else 1.0)
+                        for u, v, d in G.edges(data=True)], dtype=np.float64)
+    h.update(aristas.tobytes())
+    h.update(huella_personalizacion(personalization, nodos).encode())
+    return h.hexdigest()
+
+
+class CacheRanking:
+    """
+    Caché de resultados de PageRank ({nodo: score}) por clave (ver clave_matriz / clave_digrafo).
+
+    - En memoria: LRU de como mucho max_memoria resultados
+    - En disco (si se da directorio): un .npz por clave, como mucho max_disco archivos;
+      al pasarse se borran los usados hace más tiempo
+    Cuenta aciertos (en memoria y en disco), fallos y desalojos.
+    """
+
+    def __init__(self, max_memoria=64, directorio=None, max_disco=1024):
+        self.max_memoria = max_memoria
+        self.directorio = directorio
+        self.max_disco = max_disco
+        self._memoria = OrderedDict()
+        self.aciertos = self.aciertos_disco = self.fallos = self.desalojos = 0
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+
+    def _ruta(self, clave):
+        return os.path.join(self.directorio, f"{clave}.npz")
+
+    def _recordar(self, clave, pr):
+        self._memoria[clave] = pr
+        self._memoria.move_to_end(clave)
+        while len(self._memoria) > self.max_memoria:
+            self._memoria.popitem(last=False)
+            self.desalojos += 1
+
+    def _leer_disco(self, clave):
+        ruta = self._ruta(clave)
+        try:
+            with np.load(ruta) as datos:
+                nodos = decodificar_nombres(datos['nombres'])
+                if datos['nombres_enteros']:
+                    nodos = [int(n) for n in nodos]
+                pr = dict(zip(nodos, datos['scores'].tolist()))
+        except (OSError, ValueError, KeyError):
+            return None
+        os.utime(ruta)
+        return pr
+
+    def _escribir_disco(self, clave, pr):
+        nodos = list(pr)
+        _guardar(self._ruta(clave), {
+            'nombres': codificar_nombres([str(n) for n in nodos]),
+            'nombres_enteros': np.bool_(all(isinstance(n, (int, np.integer)) for n in nodos)),
+            'scores': np.fromiter(pr.values(), dtype=np.float64, count=len(pr)),
+        })
+        archivos = [os.path.join(self.directorio, a) for a in os.listdir(self.directorio) if a.endswith(".npz")]
+        if len(archivos) > self.max_disco:
+            archivos.sort(key=os.path.getmtime)
+            for ruta in archivos[:len(archivos) - self.max_disco]:
+                os.remove(ruta)
+                self.desalojos += 1
+
+    def obtener(self, clave):
+        """Copia del resultado guardado para clave, o None."""
+        if clave in self._memoria:
+            self._memoria.move_to_end(clave)
+            self.aciertos += 1
+            contar("cache_ranking.aciertos")
+            return dict(self._memoria[clave])
+        if self.directorio:
+            pr = self._leer_disco(clave)
+            if pr is not None:
+                self.aciertos_disco += 1
+                contar("cache_ranking.aciertos_disco")
+                self._recordar(clave, pr)
+                return dict(pr)
+        self.fallos += 1
+        contar("cache_ranking.fallos")
+        return None
+
+    def guardar(self, clave, pr):
+        self._recordar(clave, dict(pr))
+        if self.directorio:
+            self._escribir_disco(clave, pr)
+
+    def obtener_o_calcular(self, clave, calcular):
+        """Devuelve el resultado de clave; si no está, llama a calcular() y lo guarda."""
+        pr = self.obtener(clave)
+        if pr is None:
+            pr = calcular()
+            self.guardar(clave, pr)
+        return pr
+
+    def estadisticas(self):
+        consultas = self.aciertos + self.aciertos_disco + self.fallos
+        return {
+            'aciertos': self.aciertos,
+            'aciertos_disco': self.aciertos_disco,
+            'fallos': self.fallos,
+            'desalojos': self.desalojos,
+            'en_memoria': len(self._memoria),
+            'tasa_aciertos': (self.aciertos + self.aciertos_disco) / consultas if consultas else 0.0,
+        }
+
+
+def _pagerank_nx(G, **parametros):
+    # NetworkX no expone iteraciones ni residuo: solo se registran tamaño y tiempo
+    with etapa("nx.pagerank", aristas=G.number_of_edges()):
+        pr = nx.pagerank(G, **parametros)
+    registrar_calculo("networkx", G.number_of_nodes(), alpha=parametros.get('alpha', 0.85))
+    return pr
+
+
+def pagerank_networkx(G, cache=None, **parametros):
+    """nx.pagerank(G, **parametros) pasando por la caché si se da una."""
+    if cache is None:
+        return _pagerank_nx(G, **parametros)
+    clave = clave_digrafo(G, **parametros)
+    return cache.obtener_o_calcular(clave, lambda: _pagerank_nx(G, **parametros))
@@ -0,0 +1,215 @@
+import heapq
+
+import numpy as np
+
+from grafo_compilado import codificar_nombres, decodificar_nombres, _guardar
+from indice_arbol import indice_de
+
+
+def _tabla_maximos(valores):
+    """
+    Sparse table de posiciones del máximo: tabla[j][i] es la posición del mayor valor
+    en valores[i:i + 2**j] (con empate, la primera). Se construye en O(n log n).
+    """
+    tabla = [np.arange(len(valores), dtype=np.int32)]
+    ancho = 1
+    while 2 * ancho <= len(valores):
+        previo = tabla[-1]
+        a, b = previo[:-ancho], previo[ancho:]
+        tabla.append(np.where(valores[a] >= valores[b], a, b))
+        ancho *= 2
+    return tabla
+
+
+class RankingArbol:
+    """
+    Consultas de navegación sobre un ranking ya calculado ("los k mejores bajo esta carpeta").
+
+    - Hijos de cada nodo en CSR, preordenados de mayor a menor score: top-k hijos es un slice
+    - Scores en el orden del recorrido de Euler: los descendientes de v son el rango
+      (entrada[v], salida[v]), y una sparse table da el máximo de cualquier rango en O(1);
+      top-k descendientes saca k máximos partiendo rangos con un heap, O(k log k)
+    - Sumas acumuladas de esos scores: suma, media y máximo de cualquier subárbol en O(1)
+    - Un nodo con varios padres (un género repetido) cuelga en el recorrido solo del
+      primero (ver indice_arbol); las aristas a hijos fuera del rango de su padre se
+      guardan aparte, y los descendientes de v son la unión de su rango con los rangos
+      de esos hijos alcanzables desde él. Así cuenta bajo todos sus padres. Solo cambian
+      los ancestros (en el recorrido) del origen de esas aristas: sus rangos, tamaño, suma
+      y máximo se calculan una vez al construir, y las consultas siguen en O(1)
+    Se construye una vez por ranking y se guarda junto a los scores (guardar / cargar).
+    """
+
+    def __init__(self, nodos, scores, inicio, hijos, orden, entrada, salida):
+        self.nodos = list(nodos)
+        self.id = {n: i for i, n in enumerate(self.nodos)}
+        self.scores = scores
+        self.inicio = inicio
+        self.hijos = hijos
+        self.orden = orden
+        self.entrada = entrada
+        self.salida = salida
+        self.scores_euler = scores[orden]
+        self._tabla = _tabla_maximos(self.scores_euler)
+        self._acumulado = np.zeros(len(scores) + 1, dtype=np.float64)
+        np.cumsum(self.scores_euler, out=self._acumulado[1:])
+
+        # Aristas padre -> hijo con el hijo fuera del rango del padre (padres repetidos)
+        padres = np.repeat(np.arange(len(scores)), np.diff(inicio))
+        e_hijo = entrada[hijos]
+        fuera = (e_hijo < entrada[padres]) | (e_hijo >= salida[padres])
+        self._cruce_origen = entrada[padres[fuera]]
+        self._cruce_destino = hijos[fuera]
+
+        # Nodos cuyo rango contiene el origen de alguna de esas aristas: (rangos, tamaño, suma, posición del máximo)
+        self._extra = {}
+        if len(self._cruce_origen):
+            origenes = np.concatenate(([0], np.cumsum(np.bincount(self._cruce_origen, minlength=len(scores)))))
+            for i in np.flatnonzero(origenes[salida] > origenes[entrada]).tolist():
+                rangos = self._cerrar_rangos(i)
+                if len(rangos) > 1:
+                    posiciones = [self._maximo(l, r) for l, r in rangos]
+                    self._extra[i] = (
+                        rangos,
+                        sum(r - l for l, r in rangos),
+                        float(sum(self._acumulado[r] - self._acumulado[l] for l, r in rangos)),
+                        max(posiciones, key=lambda p: (self.scores_euler[p], -p)),
+                    )
+
+    @classmethod
+    def desde_indice(cls, indice, pr):
+        """Ranking sobre un IndiceArbol con los scores del diccionario pr."""
+        n = len(indice.nodos)
+        scores = np.fromiter((pr.get(nodo, 0) for nodo in indice.nodos), dtype=np.float64, count=n)
+        # Orden estable dentro de cada lista de hijos: primero por padre, después por score descendente
+        padre_lista = np.repeat(np.arange(n), np.diff(indice.inicio))
+        hijos = indice.hijos[np.lexsort((-scores[indice.hijos], padre_lista))]
+        return cls(indice.nodos, scores, indice.inicio, hijos, indice.orden, indice.entrada, indice.salida)
+
+    def _maximo(self, l, r):
+        """Posición (en orden de Euler) del mayor score en [l, r)."""
+        j = (r - l).bit_length() - 1
+        a, b = self._tabla[j][l], self._tabla[j][r - (1 << j)]
+        return int(a) if self.scores_euler[a] >= self.scores_euler[b] else int(b)
+
+    def _rangos(self, i):
+        """Rangos disjuntos (l, r) del orden de Euler con todos los descendientes de i (incluido)."""
+        extra = self._extra.get(i)
+        return extra[0] if extra else [(int(self.entrada[i]), int(self.salida[i]))]
+
+    def _cerrar_rangos(self, i):
+        """
+        Calcula los rangos de i: su rango más los de los hijos con otro padre en el recorrido
+        alcanzables desde él, hasta que no se añade ninguno. Se usa solo al construir.
+        """
+        l, r = int(self.entrada[i]), int(self.salida[i])
+        izq, der = np.array([l]), np.array([r])
+        while True:
+            nuevos = self._dentro(izq, der, self._cruce_origen) & \
+                ~self._dentro(izq, der, self.entrada[self._cruce_destino])
+            if not np.any(nuevos):
+                break
+            destinos = np.unique(self._cruce_destino[nuevos])
+            izq = np.concatenate((izq, self.entrada[destinos]))
+            der = np.concatenate((der, self.salida[destinos]))
+            # Los rangos del recorrido están anidados o son disjuntos: se quitan los contenidos en otro
+            orden = np.lexsort((-der, izq))
+            izq, der = izq[orden], der[orden]
+            fin_previo = np.maximum.accumulate(np.concatenate(([-1], der[:-1])))
+            libre = izq >= fin_previo
+            izq, der = izq[libre], der[libre]
+        return list(zip(izq.tolist(), der.tolist()))
+
+    @staticmethod
+    def _dentro(izq, der, posiciones):
+        """Máscara de las posiciones que caen en algún rango (izq ordenado, rangos disjuntos)."""
+        k = np.searchsorted(izq, posiciones, side='right') - 1
+        return (k >= 0) & (posiciones < der[np.maximum(k, 0)])
+
+    def top_hijos(self, nodo, k=10):
+        """Los k hijos de nodo con mayor score, como [(nodo, score)]."""
+        i = self.id[nodo]
+        ids = self.hijos[self.inicio[i]:min(self.inicio[i] + k, self.inicio[i + 1])].tolist()
+        return [(self.nodos[h], float(self.scores[h])) for h in ids]
+
+    def top_descendientes(self, nodo, k=10):
+        """Los k descendientes de nodo (todo el subárbol, sin él) con mayor score."""
+        i = self.id[nodo]
+        propio = int(self.entrada[i])
+        resultado, heap = [], []
+        for l, r in self._rangos(i):
+            # El propio nodo queda fuera: se parte su rango en su posición
+            for a, b in ((l, propio), (propio + 1, r)) if l <= propio < r else ((l, r),):
+                if a < b:
+                    p = self._maximo(a, b)
+                    heap.append((-self.scores_euler[p], p, a, b))
+        heapq.heapify(heap)
+        while heap and len(resultado) < k:
+            _, p, l, r = heapq.heappop(heap)
+            h = int(self.orden[p])
+            resultado.append((self.nodos[h], float(self.scores[h])))
+            for a, b in ((l, p), (p + 1, r)):
+                if a < b:
+                    q = self._maximo(a, b)
+                    heapq.heappush(heap, (-self.scores_euler[q], q, a, b))
+        return resultado
+
+    def tamano_subarbol(self, nodo):
+        """Número de nodos del subárbol de nodo (incluido)."""
+        i = self.id[nodo]
+        extra = self._extra.get(i)
+        return extra[1] if extra else int(self.salida[i] - self.entrada[i])
+
+    def suma_subarbol(self, nodo):
+        """Masa de PageRank del subárbol de nodo (incluido)."""
+        i = self.id[nodo]
+        extra = self._extra.get(i)
+        return extra[2] if extra else float(self._acumulado[self.salida[i]] - self._acumulado[self.entrada[i]])
+
+    def media_subarbol(self, nodo):
+        return self.suma_subarbol(nodo) / self.tamano_subarbol(nodo)
+
+    def maximo_subarbol(self, nodo):
+        """Nodo con mayor score del subárbol de nodo (incluido) y su score."""
+        i = self.id[nodo]
+        extra = self._extra.get(i)
+        h = int(self.orden[extra[3] if extra else self._maximo(int(self.entrada[i]), int(self.salida[i]))])
+        return self.nodos[h], float(self.scores[h])
+
+    def resumen_subarbol(self, nodo):
+        """Suma, media, máximo y tamaño del subárbol de nodo, para comparar ramas."""
+        nodo_maximo, maximo = self.maximo_subarbol(nodo)
+        return {
+            'nodos': self.tamano_subarbol(nodo),
+            'suma': self.suma_subarbol(nodo),
+            'media': self.media_subarbol(nodo),
+            'maximo': maximo,
+            'nodo_maximo': nodo_maximo,
+        }
+
+    def guardar(self, ruta):
+        """Scores y estructuras de consulta en un .npz (sparse table y sumas se rehacen al cargar)."""
+        enteros = all(isinstance(n, (int, np.integer)) for n in self.nodos)
+        _guardar(ruta, {
+            'nombres': codificar_nombres([str(n) for n in self.nodos]),
+            'nombres_enteros': np.bool_(enteros),
+            'scores': self.scores,
+            'inicio': self.inicio,
+            'hijos': self.hijos,
+            'orden': self.orden,
+            'entrada': self.entrada,
+            'salida': self.salida,
+        })
+
+    @classmethod
+    def cargar(cls, ruta):
+        with np.load(ruta) as datos:
+            nodos = decodificar_nombres(datos['nombres'])
+            if datos['nombres_enteros']:
+                nodos = [int(n) for n in nodos]
+            return cls(nodos, datos['scores'], datos['inicio'], datos['hijos'],
+                       datos['orden'], datos['entrada'], datos['salida'])
+
+
+def ranking_de(G, pr, modo="niveles"):
+    """RankingArbol de los scores pr sobre el índice del grafo G (ver indice_arbol.indice_de)."""
+    return RankingArbol.desde_indice(indice_de(G, modo), pr)
@@ -1,14 +1,27 @@
+import argparse
+import os
+import sys
+import numpy as np
 import networkx as nx
-from lector import leer_entrada
-from imprimir import imprime_grafo, imprime_grafo_invertido
+from lector_aristas import leer_entrada
+from imprimir_aristas import imprime_grafo, imprime_grafo_invertido
 from validador import esGrafoValido
 import logging
 
+# El motor disperso está en la raíz del repositorio
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from motor_pagerank import indexar_nodos, construir_componentes, combinar_componentes, iteracion_potencia
+from indice_arbol import indice_de
+from cache_ranking import CacheRanking, pagerank_networkx
+from instrumentacion import instrumentar
+from exportar_tabla import exportar_tabla_paginada, FORMATOS
+
 
 # ============================================================================
 # PageRank en Referencias Bidireccionales
 # ============================================================================
 
+@instrumentar()
 def fase1_pagerank_referencias(G, referencias_usuario, alpha=0.85):
     
     # Obtener todos los nodos que participan en referencias
@@ -28,7 +41,7 @@ def fase1_pagerank_referencias(G, referencias_usuario, alpha=0.85):
     
     # Calcular PageRank en referencias
     if len(referencias_usuario) > 0:
-        pr_referencias = nx.pagerank(G_referencias, alpha=alpha)
+        pr_referencias = pagerank_networkx(G_referencias, alpha=alpha)
     else:
         # Si no hay referencias, distribución uniforme
         pr_referencias = {n: 1.0/len(nodos_con_referencias) for n in nodos_con_referencias}
@@ -40,6 +53,7 @@ def fase1_pagerank_referencias(G, referencias_usuario, alpha=0.85):
 # PageRank en Árbol Completo Bidireccional
 # ============================================================================
 
+@instrumentar()
 def fase2_pagerank_arbol_completo(G, referencias_usuario, nodos_con_referencias, pr_referencias, 
                                   peso_jerarquico=1.0, peso_referencia=1.0, usar_pesos=False, alpha=0.85):
     
@@ -75,9 +89,22 @@ def fase2_pagerank_arbol_completo(G, referencias_usuario, nodos_con_referencias,
             G_completo.edges[v, u]['weight'] = peso_referencia
     
     # Crear personalización usando resultados de Fase 1
+    personalization = _personalizacion_fase2(G_completo.nodes(), nodos_con_referencias, pr_referencias)
+    
+    # Calcular PageRank final
+    if usar_pesos:
+        pr_final = pagerank_networkx(G_completo, alpha=alpha, personalization=personalization, weight='weight')
+    else:
+        pr_final = pagerank_networkx(G_completo, alpha=alpha, personalization=personalization)
+    
+    return pr_final
+
+
+def _personalizacion_fase2(nodos, nodos_con_referencias, pr_referencias):
+    """Personalización de la fase 2: valor de la fase 1 para nodos con referencias, uniforme para el resto."""
     personalization = {}
-    N = len(G_completo.nodes())
-    for n in G_completo.nodes():
+    N = len(nodos)
+    for n in nodos:
         if n in nodos_con_referencias:
             # Nodos con referencias usan su valor de Fase 1
             personalization[n] = pr_referencias.get(n, 1.0/N)
@@ -87,27 +114,73 @@ def fase2_pagerank_arbol_completo(G, referencias_usuario, nodos_con_referencias,
     
     # Normalizar personalización
     total_pers = sum(personalization.values())
-    personalization = {n: v/total_pers for n, v in personalization.items()}
+    return {n: v/total_pers for n, v in personalization.items()}
+
+
+# ============================================================================
+# Barrido de pesos sobre estructura compartida
+# ============================================================================
+
+@instrumentar()
+def fase2_barrido_pesos(G, referencias_usuario, nodos_con_referencias, pr_referencias,
+                        pares_pesos, alpha=0.85):
+    """
+    Calcula la fase 2 para cada par (peso_jerarquico, peso_referencia) de pares_pesos.
+    La jerarquía y las referencias se preparan una sola vez como dos componentes
+    dispersas; cada par solo recombina los pesos y arranca desde la solución anterior.
+    """
+    nodos, indice = indexar_nodos(G.nodes())
+    referencias_set = set(referencias_usuario)
     
-    # Calcular PageRank final
-    if usar_pesos:
-        pr_final = nx.pagerank(G_completo, alpha=alpha, personalization=personalization, weight='weight')
-    else:
-        pr_final = nx.pagerank(G_completo, alpha=alpha, personalization=personalization)
+    # Componente jerárquica y componente de referencias, ambas bidireccionales
+    jerarquia = [(indice[u], indice[v]) for u, v in G.edges() if (u, v) not in referencias_set]
+    referencias = [(indice[u], indice[v]) for u, v in referencias_usuario]
+    componentes = []
+    for aristas in (jerarquia, referencias):
+        origenes = [u for u, v in aristas] + [v for u, v in aristas]
+        destinos = [v for u, v in aristas] + [u for u, v in aristas]
+        componentes.append((origenes, destinos))
+    estructura = construir_componentes(len(nodos), componentes)
     
-    return pr_final
+    personalization = _personalizacion_fase2(nodos, nodos_con_referencias, pr_referencias)
+    p = np.array([personalization[n] for n in nodos])
+    
+    resultados = {}
+    x = None
+    for peso_jerarquico, peso_referencia in pares_pesos:
+        PT, colgantes = combinar_componentes(estructura, (peso_jerarquico, peso_referencia))
+        # Arranque en caliente desde el par anterior
+        x, _, _ = iteracion_potencia(PT, colgantes, alpha, p, x0=x)
+        resultados[(peso_jerarquico, peso_referencia)] = dict(zip(nodos, x.tolist()))
+    
+    return resultados
 
 
 # ============================================================================
 # ALGORITMO COMPLETO
 # ============================================================================
 
-def algoritmo_dos_fases_completo(G, referencias_usuario, alpha=0.85):
+@instrumentar()
+def algoritmo_dos_fases_completo(G, referencias_usuario, alpha=0.85, barrido=False):
     
     
     # PageRank en referencias bidireccionales
     pr_referencias, nodos_con_referencias = fase1_pagerank_referencias(G, referencias_usuario, alpha)
     
+    # Modo barrido: las 5 variantes comparten estructura y arranque en caliente
+    if barrido:
+        pares = [(1.0, 1.0), (1.0, 2.0), (2.0, 1.0), (1.0, 5.0), (5.0, 1.0)]
+        pr = fase2_barrido_pesos(G, referencias_usuario, nodos_con_referencias, pr_referencias, pares, alpha)
+        return {
+            'fase1_referencias': pr_referencias,
+            'nodos_con_referencias': nodos_con_referencias,
+            'sin_pesos': pr[(1.0, 1.0)],
+            'peso_referencias_2x': pr[(1.0, 2.0)],
+            'peso_jerarquia_2x': pr[(2.0, 1.0)],
+            'peso_referencias_5x': pr[(1.0, 5.0)],
+            'peso_jerarquia_5x': pr[(5.0, 1.0)]
+        }
+    
     # PageRank en árbol completo - 3 variantes
     
     # Variante 1: SIN PESOS (todas las relaciones valen igual)
@@ -169,172 +242,190 @@ def algoritmo_dos_fases_completo(G, referencias_usuario, alpha=0.85):
 # PROGRAMA PRINCIPAL
 # ============================================================================
 
-print("="*70)
-print(" PAGERANK DOS FASES BIDIRECCIONAL ")
-print("="*70)
-
-# LEER ENTRADA
-parentesco = 0
-G = leer_entrada("entrada.txt", parentesco)
-
-parentesco = 1
-G2 = leer_entrada("entrada.txt", parentesco)
-
-# VALIDAR ESTRUCTURA
-valido = esGrafoValido(G)
-if not valido:
-    logging.error("La estructura del grafo no es válida. Terminando el programa.")
-    exit(1)
-
-# DEFINIR REFERENCIAS DEL USUARIO
-# Estas son las referencias que el usuario proporciona (pueden ser entre cualquier nodo)
-referencias_usuario = [
-    (15, 18),
-    (19, 17),
-    (20, 18)
-]
-
-# Añadir las referencias al grafo (sin hacerlas bidireccionales todavía)
-for u, v in referencias_usuario:
-    if not G.has_edge(u, v):
-        G.add_edge(u, v)
-
-# Hacer lo mismo para G2 (inverso)
-referencias_usuario_g2 = [
-    (18, 15),
-    (17, 19),
-    (18, 20)
-]
-for u, v in referencias_usuario_g2:
-    if not G2.has_edge(u, v):
-        G2.add_edge(u, v)
-
-# ASIGNACIÓN DE ETIQUETAS
-for n in G.nodes():
-    G.nodes[n]["etiqueta"] = "importante" if n % 2 == 0 else "normal"
-
-for n in G2.nodes():
-    G2.nodes[n]["etiqueta"] = "importante" if n % 2 == 0 else "normal"
-
-# Identificar nodos hoja
-nodos_hoja = [n for n in G.nodes() if G.in_degree(n) == 0]
-
-print("\nCalculando algoritmo de dos fases...")
-
-# EJECUTAR ALGORITMO COMPLETO
-resultados = algoritmo_dos_fases_completo(G, referencias_usuario)
-
-# PageRank normal como baseline
-pr_normal = nx.pagerank(G, alpha=0.85)
-
-# ============================================================================
-# TABLA 1: RESULTADOS FASE 1 (Referencias)
-# ============================================================================
-
-print("\n" + "="*70)
-print("PageRank en REFERENCIAS BIDIRECCIONALES")
-print("Referencias del usuario:", referencias_usuario)
-print("="*70)
-
-print("\n{:<10} {:<20}".format("Nodo", "PageRank Referencias"))
-print("-"*35)
-
-nodos_con_referencias = resultados['nodos_con_referencias']
-for nodo in sorted(nodos_con_referencias):
-    valor = resultados['fase1_referencias'].get(nodo, 0)
-    print("{:<10} {:<20.6f}".format(nodo, valor))
-
-# ============================================================================
-# TABLA 2: COMPARACIÓN DE LAS 3 VARIANTES PRINCIPALES
-# ============================================================================
-
-print("\n" + "="*70)
-print("COMPARACIÓN DE LAS 3 VARIANTES PRINCIPALES")
-print("="*70)
-
-print("\n{:<10} {:<20} {:<20} {:<20} {:<20}".format(
-    "Nodo", "Sin Pesos", "Peso Refs 2x", "Peso Jerárq 2x", "Normal (baseline)"))
-print("-"*90)
-
-for nodo in sorted(G.nodes()):
-    sin_p = resultados['sin_pesos'].get(nodo, 0)
-    ref_2x = resultados['peso_referencias_2x'].get(nodo, 0)
-    jer_2x = resultados['peso_jerarquia_2x'].get(nodo, 0)
-    normal = pr_normal.get(nodo, 0)
-    print("{:<10} {:<20.6f} {:<20.6f} {:<20.6f} {:<20.6f}".format(
-        nodo, sin_p, ref_2x, jer_2x, normal))
-
-# ============================================================================
-# TABLA 3: CONFIGURACIONES EXPERIMENTALES (Pesos extremos)
-# ============================================================================
-
-print("\n" + "="*70)
-print("CONFIGURACIONES EXPERIMENTALES (Pesos extremos)")
-print("="*70)
-
-print("\n{:<10} {:<20} {:<20} {:<20} {:<20}".format(
-    "Nodo", "Sin Pesos", "Refs 2x", "Refs 5x", "Jerárq 5x"))
-print("-"*90)
-
-for nodo in sorted(G.nodes()):
-    sin_p = resultados['sin_pesos'].get(nodo, 0)
-    ref_2x = resultados['peso_referencias_2x'].get(nodo, 0)
-    ref_5x = resultados['peso_referencias_5x'].get(nodo, 0)
-    jer_5x = resultados['peso_jerarquia_5x'].get(nodo, 0)
-    print("{:<10} {:<20.6f} {:<20.6f} {:<20.6f} {:<20.6f}".format(
-        nodo, sin_p, ref_2x, ref_5x, jer_5x))
-
-# ============================================================================
-# TABLA 4: DIFERENCIAS respecto a Sin Pesos
-# ============================================================================
-
-print("\n" + "="*70)
-print("DIFERENCIAS respecto a SIN PESOS")
-print("="*70)
-
-print("\n{:<10} {:<20} {:<20} {:<20}".format(
-    "Nodo", "Sin Pesos", "Diff Refs 2x", "Diff Jerárq 2x"))
-print("-"*70)
-
-for nodo in sorted(G.nodes()):
-    sin_p = resultados['sin_pesos'].get(nodo, 0)
-    ref_2x = resultados['peso_referencias_2x'].get(nodo, 0)
-    jer_2x = resultados['peso_jerarquia_2x'].get(nodo, 0)
+# Las funciones anteriores se pueden importar (p. ej. desde benchmark_escala);
+# lo siguiente solo se ejecuta al lanzar el script
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="PageRank en dos fases sobre el árbol de demo4")
+    parser.add_argument("--cache", metavar="DIRECTORIO",
+                        help="guarda el PageRank de referencia en disco para no recalcularlo entre ejecuciones")
+    parser.add_argument("--tabla", metavar="DIRECTORIO",
+                        help="exporta además las diferencias respecto a sin pesos, por páginas, a DIRECTORIO")
+    parser.add_argument("--tabla-formato", choices=FORMATOS, default="csv")
+    parser.add_argument("--filas-por-pagina", type=int, default=10000)
+    args = parser.parse_args()
+
+    print("="*70)
+    print(" PAGERANK DOS FASES BIDIRECCIONAL ")
+    print("="*70)
+
+    # LEER ENTRADA
+    parentesco = 0
+    G = leer_entrada("entrada.txt", parentesco)
+
+    parentesco = 1
+    G2 = leer_entrada("entrada.txt", parentesco)
+
+    # VALIDAR ESTRUCTURA
+    valido = esGrafoValido(G)
+    if not valido:
+        logging.error("La estructura del grafo no es válida. Terminando el programa.")
+        exit(1)
+
+    # DEFINIR REFERENCIAS DEL USUARIO
+    # Estas son las referencias que el usuario proporciona (pueden ser entre cualquier nodo)
+    referencias_usuario = [
+        (15, 18),
+        (19, 17),
+        (20, 18)
+    ]
+
+    # Añadir las referencias al grafo (sin hacerlas bidireccionales todavía)
+    for u, v in referencias_usuario:
+        if not G.has_edge(u, v):
+            G.add_edge(u, v)
+
+    # Hacer lo mismo para G2 (inverso)
+    referencias_usuario_g2 = [
+        (18, 15),
+        (17, 19),
+        (18, 20)
+    ]
+    for u, v in referencias_usuario_g2:
+        if not G2.has_edge(u, v):
+            G2.add_edge(u, v)
+
+    # ASIGNACIÓN DE ETIQUETAS
+    for n in G.nodes():
+        G.nodes[n]["etiqueta"] = "importante" if n % 2 == 0 else "normal"
+
+    for n in G2.nodes():
+        G2.nodes[n]["etiqueta"] = "importante" if n % 2 == 0 else "normal"
+
+    # Identificar nodos hoja (sin hijos; las aristas van hijo -> padre)
+    nodos_hoja = sorted(indice_de(G, "invertidas").hojas())
+
+    print("\nCalculando algoritmo de dos fases...")
+
+    # EJECUTAR ALGORITMO COMPLETO
+    resultados = algoritmo_dos_fases_completo(G, referencias_usuario)
+
+    # PageRank normal como baseline (con --cache se guarda en disco: no cambia entre ejecuciones si no cambia el grafo)
+    cache = CacheRanking(directorio=args.cache) if args.cache else None
+    pr_normal = pagerank_networkx(G, cache, alpha=0.85)
+
+    # ============================================================================
+    # TABLA 1: RESULTADOS FASE 1 (Referencias)
+    # ============================================================================
+
+    print("\n" + "="*70)
+    print("PageRank en REFERENCIAS BIDIRECCIONALES")
+    print("Referencias del usuario:", referencias_usuario)
+    print("="*70)
+
+    print("\n{:<10} {:<20}".format("Nodo", "PageRank Referencias"))
+    print("-"*35)
+
+    nodos_con_referencias = resultados['nodos_con_referencias']
+    for nodo in sorted(nodos_con_referencias):
+        valor = resultados['fase1_referencias'].get(nodo, 0)
+        print("{:<10} {:<20.6f}".format(nodo, valor))
+
+    # ============================================================================
+    # TABLA 2: COMPARACIÓN DE LAS 3 VARIANTES PRINCIPALES
+    # ============================================================================
+
+    print("\n" + "="*70)
+    print("COMPARACIÓN DE LAS 3 VARIANTES PRINCIPALES")
+    print("="*70)
+
+    print("\n{:<10} {:<20} {:<20} {:<20} {:<20}".format(
+        "Nodo", "Sin Pesos", "Peso Refs 2x", "Peso Jerárq 2x", "Normal (baseline)"))
+    print("-"*90)
+
+    for nodo in sorted(G.nodes()):
+        sin_p = resultados['sin_pesos'].get(nodo, 0)
+        ref_2x = resultados['peso_referencias_2x'].get(nodo, 0)
+        jer_2x = resultados['peso_jerarquia_2x'].get(nodo, 0)
+        normal = pr_normal.get(nodo, 0)
+        print("{:<10} {:<20.6f} {:<20.6f} {:<20.6f} {:<20.6f}".format(
+            nodo, sin_p, ref_2x, jer_2x, normal))
+
+    # ============================================================================
+    # TABLA 3: CONFIGURACIONES EXPERIMENTALES (Pesos extremos)
+    # ============================================================================
+
+    print("\n" + "="*70)
+    print("CONFIGURACIONES EXPERIMENTALES (Pesos extremos)")
+    print("="*70)
+
+    print("\n{:<10} {:<20} {:<20} {:<20} {:<20}".format(
+        "Nodo", "Sin Pesos", "Refs 2x", "Refs 5x", "Jerárq 5x"))
+    print("-"*90)
+
+    for nodo in sorted(G.nodes()):
+        sin_p = resultados['sin_pesos'].get(nodo, 0)
+        ref_2x = resultados['peso_referencias_2x'].get(nodo, 0)
+        ref_5x = resultados['peso_referencias_5x'].get(nodo, 0)
+        jer_5x = resultados['peso_jerarquia_5x'].get(nodo, 0)
+        print("{:<10} {:<20.6f} {:<20.6f} {:<20.6f} {:<20.6f}".format(
+            nodo, sin_p, ref_2x, ref_5x, jer_5x))
+
+    # ============================================================================
+    # TABLA 4: DIFERENCIAS respecto a Sin Pesos
+    # ============================================================================
+
+    print("\n" + "="*70)
+    print("DIFERENCIAS respecto a SIN PESOS")
+    print("="*70)
+
+    print("\n{:<10} {:<20} {:<20} {:<20}".format(
+        "Nodo", "Sin Pesos", "Diff Refs 2x", "Diff Jerárq 2x"))
+    print("-"*70)
+
+    for nodo in sorted(G.nodes()):
+        sin_p = resultados['sin_pesos'].get(nodo, 0)
+        ref_2x = resultados['peso_referencias_2x'].get(nodo, 0)
+        jer_2x = resultados['peso_jerarquia_2x'].get(nodo, 0)
     
-    diff_ref = ref_2x - sin_p
-    diff_jer = jer_2x - sin_p
+        diff_ref = ref_2x - sin_p
+        diff_jer = jer_2x - sin_p
     
-    print("{:<10} {:<20.6f} {:<+20.6f} {:<+20.6f}".format(
-        nodo, sin_p, diff_ref, diff_jer))
+        print("{:<10} {:<20.6f} {:<+20.6f} {:<+20.6f}".format(
+            nodo, sin_p, diff_ref, diff_jer))
 
-# ============================================================================
-# ÁRBOLES CON FORMATO ORIGINAL
-# ============================================================================
+    if args.tabla:
+        exportar_tabla_paginada(resultados['sin_pesos'], resultados['peso_referencias_2x'],
+                                resultados['peso_jerarquia_2x'], args.tabla, args.filas_por_pagina,
+                                args.tabla_formato, ordenar_por=1, nombres=("Sin Pesos", "Refs 2x", "Jerárq 2x"))
+
+    # ============================================================================
+    # ÁRBOLES CON FORMATO ORIGINAL
+    # ============================================================================
 
-print("\n" + "="*70)
-print("RESULTADOS DETALLADOS CON FORMATO ORIGINAL")
-print("="*70)
+    print("\n" + "="*70)
+    print("RESULTADOS DETALLADOS CON FORMATO ORIGINAL")
+    print("="*70)
 
-imprime_grafo(G, pr_normal, 
-              "BASELINE: PageRank Normal (direccional original)")
+    imprime_grafo(G, pr_normal, 
+                  "BASELINE: PageRank Normal (direccional original)")
 
-print("\n--- RESULTADOS DOS FASES ---\n")
+    print("\n--- RESULTADOS DOS FASES ---\n")
 
-imprime_grafo(G, resultados['sin_pesos'], 
-              "DOS FASES - SIN PESOS (todas las relaciones valen igual)")
+    imprime_grafo(G, resultados['sin_pesos'], 
+                  "DOS FASES - SIN PESOS (todas las relaciones valen igual)")
 
-imprime_grafo(G, resultados['peso_referencias_2x'], 
-              "DOS FASES - PESO EN REFERENCIAS 2x (referencias más importantes)")
+    imprime_grafo(G, resultados['peso_referencias_2x'], 
+                  "DOS FASES - PESO EN REFERENCIAS 2x (referencias más importantes)")
 
-imprime_grafo(G, resultados['peso_jerarquia_2x'], 
-              "DOS FASES - PESO EN JERARQUÍA 2x (jerarquía más importante)")
+    imprime_grafo(G, resultados['peso_jerarquia_2x'], 
+                  "DOS FASES - PESO EN JERARQUÍA 2x (jerarquía más importante)")
 
-print("\n--- CASOS EXTREMOS ---\n")
+    print("\n--- CASOS EXTREMOS ---\n")
 
-imprime_grafo(G, resultados['peso_referencias_5x'], 
-              "DOS FASES - Referencias 5x más importantes")
+    imprime_grafo(G, resultados['peso_referencias_5x'], 
+                  "DOS FASES - Referencias 5x más importantes")
 
-imprime_grafo(G, resultados['peso_jerarquia_5x'], 
-              "DOS FASES - Jerarquía 5x más importante")
+    imprime_grafo(G, resultados['peso_jerarquia_5x'], 
+                  "DOS FASES - Jerarquía 5x más importante")
 
 
@@ -1,12 +1,22 @@
-import networkx as nx
+import os
+import sys
 import logging
 
-def _imprimir_arbol_recursivo(grafo, nodo_actual, pagerank_dict, prefijo="", es_ultimo=True):
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from indice_arbol import indice_de
+from instrumentacion import instrumentar
+
+def _hijos(indice, nodo):
+    """Hijos de un nodo según el índice del árbol (vacío si el nodo no está en el grafo)."""
+    i = indice.id.get(nodo)
+    if i is None:
+        return []
+    return [indice.nodos[h] for h in indice.hijos_de(i).tolist()]
+
+def _imprimir_arbol_recursivo(indice, nodo_actual, pagerank_dict, prefijo="", es_ultimo=True):
     """Función interna recursiva para dar formato de árbol."""
-    try:
-        hijos = list(grafo.predecessors(nodo_actual))
-    except nx.NetworkXError:
-        hijos = []
+    # Hijos = predecesores (las aristas van hijo -> padre)
+    hijos = _hijos(indice, nodo_actual)
 
     hijos_ordenados = sorted(hijos, key=lambda h: pagerank_dict.get(h, 0), reverse=True)
     num_hijos = len(hijos_ordenados)
@@ -19,12 +29,14 @@ def _imprimir_arbol_recursivo(grafo, nodo_actual, pagerank_dict, prefijo="", es_
         rank = pagerank_dict.get(hijo, 0)
         print(f"{prefijo}{conector}[{hijo}] (Rank: {rank:.5f})")
         
-        _imprimir_arbol_recursivo(grafo, hijo, pagerank_dict, prefijo_siguiente, es_el_ultimo_hijo)
+        _imprimir_arbol_recursivo(indice, hijo, pagerank_dict, prefijo_siguiente, es_el_ultimo_hijo)
 
+@instrumentar()
 def imprime_grafo(grafo, pagerank_dict, titulo="RESULTADOS"):
     """Identifica las raíces e inicia la impresión jerárquica del grafo."""
     print(f"\n========== {titulo} ==========")
-    nodos_raiz = [nodo for nodo in grafo.nodes() if grafo.out_degree(nodo) == 0]
+    indice = indice_de(grafo, "invertidas")
+    nodos_raiz = [indice.nodos[r] for r in indice.raices.tolist()]
     
     if not nodos_raiz:
         logging.error("No se detectaron nodos raíz (ciclo detectado o grafo vacío).")
@@ -32,17 +44,14 @@ def imprime_grafo(grafo, pagerank_dict, titulo="RESULTADOS"):
 
     for raiz in nodos_raiz:
         print(f"[{raiz}] (Rank: {pagerank_dict[raiz]:.5f})")
-        _imprimir_arbol_recursivo(grafo, raiz, pagerank_dict)
+        _imprimir_arbol_recursivo(indice, raiz, pagerank_dict)
 
 
 
-def _imprimir_arbol_recursivo_invertido(grafo, nodo_actual, pagerank_dict, prefijo="", es_ultimo=True):
+def _imprimir_arbol_recursivo_invertido(indice, nodo_actual, pagerank_dict, prefijo="", es_ultimo=True):
     """Función interna recursiva para dar formato de árbol (Padre -> Hijo)."""
-    try:
-        # Ahora buscamos sucesores (hijos) en lugar de predecesores
-        hijos = list(grafo.successors(nodo_actual))
-    except nx.NetworkXError:
-        hijos = []
+    # Ahora los hijos son los sucesores (índice construido en modo "directas")
+    hijos = _hijos(indice, nodo_actual)
 
     # Ordenamos los hijos por PageRank
     hijos_ordenados = sorted(hijos, key=lambda h: pagerank_dict.get(h, 0), reverse=True)
@@ -57,14 +66,16 @@ def _imprimir_arbol_recursivo_invertido(grafo, nodo_actual, pagerank_dict, prefi
         print(f"{prefijo}{conector}[{hijo}] (Rank: {rank:.5f})")
         
         # Llamada recursiva hacia los hijos
-        _imprimir_arbol_recursivo_invertido(grafo, hijo, pagerank_dict, prefijo_siguiente, es_el_ultimo_hijo)
+        _imprimir_arbol_recursivo_invertido(indice, hijo, pagerank_dict, prefijo_siguiente, es_el_ultimo_hijo)
 
+@instrumentar()
 def imprime_grafo_invertido(grafo, pagerank_dict, titulo="RESULTADOS"):
     """Identifica las raíces (in_degree=0) e inicia la impresión jerárquica."""
     print(f"\n========== {titulo} ==========")
     
     # La raíz es el nodo que no tiene flechas entrando (in_degree == 0)
-    nodos_raiz = [nodo for nodo in grafo.nodes() if grafo.in_degree(nodo) == 0]
+    indice = indice_de(grafo, "directas")
+    nodos_raiz = [indice.nodos[r] for r in indice.raices.tolist()]
     
     if not nodos_raiz:
         # Si no hay nodos con in_degree 0 y el grafo no está vacío, hay un ciclo
@@ -74,4 +85,4 @@ def imprime_grafo_invertido(grafo, pagerank_dict, titulo="RESULTADOS"):
 
     for raiz in nodos_raiz:
         print(f"[{raiz}] (Rank: {pagerank_dict.get(raiz, 0):.5f})")
-        _imprimir_arbol_recursivo_invertido(grafo, raiz, pagerank_dict)
\ No newline at end of file
+        _imprimir_arbol_recursivo_invertido(indice, raiz, pagerank_dict)
\ No newline at end of file
@@ -0,0 +1,182 @@
+import networkx as nx
+import numpy as np
+import mmap
+import os
+import sys
+import logging
+
+# La caché compilada está en la raíz del repositorio
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from grafo_compilado import cargar_compilado
+from instrumentacion import instrumentar
+
+logging.basicConfig(level=logging.ERROR)
+
+# Tamaño de bloque del cargador masivo (se corta siempre en un fin de línea)
+TAM_BLOQUE = 1 << 24
+
+@instrumentar()
+def leer_entrada(nombre_archivo, parentesco, cache=True, masivo=True):
+    """Lee un archivo de texto y devuelve un grafo de NetworkX con aristas invertidas. Con masivo=False se usa la lectura original línea a línea (sin caché)."""
+    """Supnemos que el archivo contiene una lista de las aristas del arbol, las relaciones de referencias las asignamos posteriormente para así comprobar la validez del grafo primero."""
+    G = nx.DiGraph()
+    try:
+        if masivo:
+            origenes, destinos = leer_aristas(nombre_archivo, parentesco, cache)
+            G.add_edges_from(zip(origenes.tolist(), destinos.tolist()))
+            return G
+
+        with open(nombre_archivo, 'r') as f:
+            # Saltamos la primera línea (metadatos)
+            f.readline()
+
+            for linea in f:
+                nueva_linea = linea.strip()
+                if nueva_linea: 
+                    valores = nueva_linea.split()
+                    if len(valores) >= 2:
+                        ini = int(valores[0])
+                        fin = int(valores[1])
+                        # Aristas invertidas (hijo -> padre) según tu lógica original
+                        if parentesco == 0:
+                            G.add_edge(fin, ini)
+                        else:
+                            G.add_edge(ini, fin)
+        return G
+    except FileNotFoundError:
+        #print(f"ERROR: No se encontró el archivo '{nombre_archivo}'.")
+        logging.error("No se pudo abrir el archivo. Verifica que el nombre y la ruta sean correctos.")
+        sys.exit(1)
+
+@instrumentar()
+def leer_aristas(nombre_archivo, parentesco, cache=True):
+    """
+    Devuelve las aristas como dos arrays int32 (origenes, destinos) sin construir NetworkX.
+    parentesco == 0 invierte las aristas (hijo -> padre) intercambiando las columnas.
+    Con caché se usan los arrays compilados (.cache.npz) si el archivo no ha cambiado.
+    """
+    datos = cargar_compilado(nombre_archivo, compilar_aristas) if cache else compilar_aristas(nombre_archivo)
+    if parentesco == 0:
+        return datos['fin'], datos['ini']
+    return datos['ini'], datos['fin']
+
+def compilar_aristas(nombre_archivo):
+    """
+    Parsea la lista de aristas a dos arrays int32 ini/fin en el orden del archivo,
+    más el número de línea (desde 1) de cada arista en 'linea' para los mensajes del validador.
+    El archivo se mapea en memoria y se procesa en bloques de TAM_BLOQUE bytes;
+    la cabecera "N M" solo se usa para reservar los arrays de salida.
+    Como en la lectura línea a línea solo cuentan los dos primeros valores de cada línea
+    (una columna de pesos o un comentario detrás se ignoran); si uno de esos no es un
+    entero da ValueError con el número de línea.
+    """
+    with open(nombre_archivo, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return {'ini': np.zeros(0, dtype=np.int32), 'fin': np.zeros(0, dtype=np.int32),
+                    'linea': np.zeros(0, dtype=np.int64)}
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    try:
+        # Cabecera (metadatos): número de nodos y de aristas
+        pos = mm.find(b"\n") + 1 or len(mm)
+        cabecera = mm[:pos].split()
+        reserva = int(cabecera[1]) if len(cabecera) >= 2 and cabecera[1].isdigit() else 0
+        ini = np.empty(reserva, dtype=np.int32)
+        fin = np.empty(reserva, dtype=np.int32)
+        linea = np.empty(reserva, dtype=np.int64)
+        total = 0
+        # Número de la primera línea del bloque actual (la cabecera es la línea 1)
+        base = 2
+
+        while pos < len(mm):
+            final = min(pos + TAM_BLOQUE, len(mm))
+            if final < len(mm):
+                # Cortar en el último fin de línea del bloque (o en el siguiente si la línea es más larga)
+                corte = mm.rfind(b"\n", pos, final)
+                final = corte + 1 if corte >= 0 else (mm.find(b"\n", final) + 1 or len(mm))
+            # Copia del bloque: una vista sobre mm impediría cerrarlo si el parseo falla
+            bloque = np.frombuffer(mm[pos:final], dtype=np.uint8)
+            a, b, l = _parsear_bloque(bloque, base)
+            base_bloque, base = base, base + int(np.count_nonzero(bloque == 10))
+
+            if total + len(a) > len(ini):
+                capacidad = max(2 * len(ini), total + len(a))
+                ini, fin, linea = np.resize(ini, capacidad), np.resize(fin, capacidad), np.resize(linea, capacidad)
+            ini[total:total + len(a)] = a
+            fin[total:total + len(a)] = b
+            linea[total:total + len(a)] = l + base_bloque
+            total += len(a)
+            pos = final
+    finally:
+        mm.close()
+
+    return {'ini': ini[:total].copy(), 'fin': fin[:total].copy(), 'linea': linea[:total].copy()}
+
+def _parsear_bloque(datos, base=0):
+    """
+    Convierte un bloque de bytes (líneas completas) en los dos primeros enteros de cada línea
+    con al menos dos valores, igual que split() + int(valores[0]), int(valores[1]) pero
+    vectorizado con NumPy: el resto de la línea (pesos, comentarios) no se mira.
+    El tercer array es la línea de cada par dentro del bloque (desde 0); base es el número
+    de línea del principio del bloque, para los mensajes de error.
+    """
+    vacio = np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int64)
+    espacio = (datos == 32) | ((datos >= 9) & (datos <= 13))
+
+    # Inicio y fin de cada valor (lo que separa split()): posiciones donde cambia la máscara
+    lleno = ~espacio
+    cambios = np.flatnonzero(lleno[1:] != lleno[:-1]) + 1
+    if lleno[0]:
+        cambios = np.concatenate(([0], cambios))
+    if lleno[-1]:
+        cambios = np.concatenate((cambios, [len(datos)]))
+    inicios, finales = cambios[0::2], cambios[1::2]
+    if len(inicios) == 0:
+        return vacio
+
+    # Primeros dos valores de cada línea que tenga al menos dos
+    linea = np.searchsorted(np.flatnonzero(datos == 10), inicios)
+    primeros = np.flatnonzero(np.concatenate(([True], linea[1:] != linea[:-1])))
+    cuenta = np.diff(np.concatenate((primeros, [len(linea)])))
+    validos = primeros[cuenta >= 2]
+    if len(validos) == 0:
+        return vacio
+    elegidos = np.concatenate((validos, validos + 1))
+    ini, fin = inicios[elegidos], finales[elegidos]
+
+    # Solo esos valores tienen que ser enteros: signo opcional y al menos una cifra
+    signo = (datos[ini] == 45) | (datos[ini] == 43)
+    cifras = ini + signo
+    largos = fin - cifras
+    # Los bytes que no son cifras ni espacios son pocos: se mira en qué valor cae cada uno
+    otros = np.flatnonzero(lleno & ((datos < 48) | (datos > 57)))
+    desde = np.full(len(inicios), len(datos))
+    desde[elegidos] = cifras
+    otros = otros[otros >= desde[np.searchsorted(inicios, otros, side='right') - 1]]
+    if len(otros) or np.any(largos == 0):
+        posicion = min(otros.min(initial=len(datos)), ini[largos == 0].min(initial=len(datos)))
+        _error_linea(datos, base, posicion, "contiene un valor que no es un entero")
+    if largos.max() > 10:
+        _error_linea(datos, base, ini[largos > 10].min(), "tiene un id de nodo que no cabe en int32")
+
+    # Valor de cada número por Horner, una pasada por posición de cifra
+    valores = np.zeros(len(ini), dtype=np.int64)
+    for k in range(largos.max()):
+        activos = largos > k
+        valores[activos] = valores[activos] * 10 + (datos[cifras[activos] + k] - 48)
+    valores[datos[ini] == 45] *= -1
+    fuera = (valores > np.iinfo(np.int32).max) | (valores < np.iinfo(np.int32).min)
+    if np.any(fuera):
+        _error_linea(datos, base, ini[fuera].min(), "tiene un id de nodo que no cabe en int32")
+
+    n = len(validos)
+    return valores[:n].astype(np.int32), valores[n:].astype(np.int32), linea[validos]
+
+def _error_linea(datos, base, posicion, motivo):
+    """ValueError con el número de línea (en el archivo) y el texto de la línea de posicion."""
+    inicio = datos[:posicion].tobytes().rfind(b"\n") + 1
+    final = datos[posicion:].tobytes().find(b"\n")
+    final = len(datos) if final < 0 else posicion + final
+    numero = base + int(np.count_nonzero(datos[:posicion] == 10))
+    texto = datos[inicio:final].tobytes().decode('utf-8', 'replace').strip()
+    raise ValueError(f"Línea {numero} de la lista de aristas {motivo}: '{texto}'")
@@ -0,0 +1,30 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from lector_aristas import leer_entrada, compilar_aristas
+
+
+def test_tres_columnas_igual_que_lectura_por_lineas(tmp_path):
+    # Pesos, comentarios y líneas con un solo valor: solo cuentan los dos primeros valores
+    ruta = tmp_path / "aristas.txt"
+    ruta.write_text("5 4\n1 2 0.5\n1 3 # comentario\n-3 +4 peso=2\n5\n\n2 4 1 7\n")
+
+    for parentesco in (0, 1):
+        masivo = leer_entrada(str(ruta), parentesco, cache=False)
+        por_lineas = leer_entrada(str(ruta), parentesco, cache=False, masivo=False)
+        assert list(masivo.edges()) == list(por_lineas.edges())
+
+    datos = compilar_aristas(str(ruta))
+    assert datos['ini'].tolist() == [1, 1, -3, 2]
+    assert datos['fin'].tolist() == [2, 3, 4, 4]
+    assert datos['linea'].tolist() == [2, 3, 4, 7]
+
+
+def test_valor_no_entero_en_las_dos_primeras_columnas(tmp_path):
+    ruta = tmp_path / "aristas.txt"
+    ruta.write_text("3 2\n1 2 x\n1 y 3\n")
+    with pytest.raises(ValueError, match="Línea 3 .*'1 y 3'"):
+        compilar_aristas(str(ruta))
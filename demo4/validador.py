@@ -1,19 +1,160 @@
-import networkx as nx
+import numpy as np
 
 import logging
 
+from lector_aristas import compilar_aristas
+from grafo_compilado import cargar_compilado
+from instrumentacion import instrumentar
+
+
+def _compactar(padres, hijos):
+    """Ids consecutivos 0..n-1 para los arrays de nodos; si ya son densos (y no negativos) se usan tal cual."""
+    if len(padres) == 0:
+        return padres, hijos, 0, None
+    minimo = int(min(padres.min(), hijos.min()))
+    maximo = int(max(padres.max(), hijos.max()))
+    if minimo >= 0 and maximo < 4 * len(padres):
+        return padres.astype(np.int64), hijos.astype(np.int64), maximo + 1, None
+    nodos, inverso = np.unique(np.concatenate((padres, hijos)), return_inverse=True)
+    return inverso[:len(padres)], inverso[len(padres):], len(nodos), nodos
+
+
+def _raiz(uf, x):
+    # Unión-búsqueda con compresión de caminos a la mitad
+    while uf[x] != x:
+        uf[x] = uf[uf[x]]
+        x = uf[x]
+    return x
+
+
+@instrumentar()
+def validar_aristas(padres, hijos, lineas=None):
+    """
+    Comprueba en una pasada que las aristas (padre -> hijo), en el orden en que llegan,
+    forman un bosque. Trabaja sobre arrays de NumPy (p. ej. los de lector_aristas.leer_aristas
+    con parentesco=1), sin construir NetworkX.
+
+    - El primer padre de cada nodo es el bueno; cada padre distinto posterior es una
+      violación "padre_multiple" (una arista repetida no cuenta, como en nx.DiGraph)
+    - Con el array de padres resultante, una arista que une un nodo con uno de sus
+      descendientes es una violación "ciclo" (la última arista del ciclo en el orden de llegada)
+    - Las aristas de padres extra también pueden cerrar un ciclo (0->1, 1->2, 2->1): esas
+      son a la vez "padre_multiple" y "ciclo"
+    Devuelve la lista de violaciones (diccionarios) ordenada por línea; sin lineas se
+    numeran las aristas desde 1.
+    """
+    padres, hijos = np.asarray(padres, dtype=np.int64), np.asarray(hijos, dtype=np.int64)
+    if len(padres) == 0:
+        return []
+    lineas = np.arange(1, len(padres) + 1) if lineas is None else np.asarray(lineas)
+    p, h, n, nombres = _compactar(padres, hijos)
+    violaciones = []
+
+    # Primer padre de cada hijo (orden estable: gana la arista que llega antes)
+    orden = np.argsort(h, kind="stable")
+    h_ord, p_ord = h[orden], p[orden]
+    primera = np.ones(len(orden), dtype=bool)
+    primera[1:] = h_ord[1:] != h_ord[:-1]
+    inicio_grupo = np.maximum.accumulate(np.where(primera, np.arange(len(orden)), 0))
+    padre_bueno = p_ord[inicio_grupo]
+    # Repetidas de la arista buena: se ignoran; el resto de padres son violaciones
+    extra = ~primera & (p_ord != padre_bueno)
+    for i in np.flatnonzero(extra).tolist():
+        arista, buena = orden[i], orden[inicio_grupo[i]]
+        violaciones.append({'tipo': "padre_multiple", 'linea': int(lineas[arista]),
+                            'nodo': hijos[arista].item(), 'padre': padres[arista].item(),
+                            'padre_previo': padres[buena].item(), 'linea_previa': int(lineas[buena])})
+
+    padre = np.full(n, -1, dtype=np.int64)
+    arista_padre = np.full(n, -1, dtype=np.int64)
+    padre[h_ord[primera]] = p_ord[primera]
+    arista_padre[h_ord[primera]] = orden[primera]
+
+    # Saltos de puntero: tras k pasos ancestro es el ancestro 2^k; pasados log2(n) pasos
+    # solo los nodos de un ciclo (o que cuelgan de uno) no han llegado a una raíz
+    ancestro = padre
+    for _ in range(int(n).bit_length() + 1):
+        if not np.any(ancestro >= 0):
+            break
+        ancestro = np.where(ancestro >= 0, ancestro[np.maximum(ancestro, 0)], -1)
+    pendientes = np.flatnonzero(ancestro >= 0)
+
+    if len(pendientes):
+        # Solo las aristas de esos nodos pueden cerrar un ciclo: se recorren en orden de
+        # llegada con unión-búsqueda, y la que une dos nodos ya conectados lo cierra
+        aristas = np.sort(arista_padre[pendientes])
+        uf = {}
+        for a in aristas.tolist():
+            u, v = int(p[a]), int(h[a])
+            ru, rv = _raiz(uf, uf.setdefault(u, u)), _raiz(uf, uf.setdefault(v, v))
+            if ru == rv:
+                ciclo, x = [v], u
+                while x != v:
+                    ciclo.append(x)
+                    x = int(padre[x])
+                ciclo.append(v)
+                ciclo = [nombres[x].item() if nombres is not None else x for x in reversed(ciclo)]
+                violaciones.append({'tipo': "ciclo", 'linea': int(lineas[a]), 'nodo': hijos[a].item(),
+                                    'padre': padres[a].item(), 'ciclo': ciclo})
+            else:
+                uf[rv] = ru
+
+    # Aristas de padres extra en orden de llegada: cierran un ciclo si el hijo es ya un
+    # ancestro del padre, subiendo por el primer padre y por los padres extra aceptados
+    padres_extra = {}
+    for a in np.sort(orden[extra]).tolist():
+        u, v = int(p[a]), int(h[a])
+        if u in padres_extra.get(v, ()):
+            continue
+        previo, pila = {u: None}, [u]
+        while pila and v not in previo:
+            x = pila.pop()
+            for y in ([int(padre[x])] if padre[x] >= 0 else []) + padres_extra.get(x, []):
+                if y not in previo:
+                    previo[y] = x
+                    pila.append(y)
+        if v in previo:
+            ciclo, x = [v], previo[v]
+            while x is not None:
+                ciclo.append(x)
+                x = previo[x]
+            ciclo.append(v)
+            ciclo = [nombres[x].item() if nombres is not None else x for x in ciclo]
+            violaciones.append({'tipo': "ciclo", 'linea': int(lineas[a]), 'nodo': hijos[a].item(),
+                                'padre': padres[a].item(), 'ciclo': ciclo})
+        else:
+            padres_extra.setdefault(v, []).append(u)
+
+    violaciones.sort(key=lambda v: v['linea'])
+    return violaciones
+
+
+def _informar(violaciones, origen="línea"):
+    for v in violaciones:
+        if v['tipo'] == "ciclo":
+            logging.error(f"{origen} {v['linea']}: la arista {v['padre']} -> {v['nodo']} cierra un ciclo "
+                          f"({' -> '.join(map(str, v['ciclo']))}).")
+        else:
+            logging.error(f"{origen} {v['linea']}: el nodo {v['nodo']} tiene más de un padre "
+                          f"({v['padre_previo']} en la línea {v['linea_previa']} y {v['padre']}).")
+
+
+def validar_archivo(nombre_archivo, cache=True):
+    """
+    Valida una lista de aristas "padre hijo" (formato de lector_aristas.leer_aristas) sin NetworkX.
+    Registra cada violación con su número de línea y devuelve la lista (vacía si es un bosque).
+    """
+    datos = cargar_compilado(nombre_archivo, compilar_aristas) if cache else compilar_aristas(nombre_archivo)
+    violaciones = validar_aristas(datos['ini'], datos['fin'], datos['linea'])
+    _informar(violaciones)
+    return violaciones
+
+
 def esGrafoValido(G):
     """Verifica si el grafo es un bosque (colección de árboles) donde cada nodo apunta a lo sumo a un padre."""
-   
-    # Comprobar si hay ciclos
-    if not nx.is_directed_acyclic_graph(G):
-        logging.error("El grafo contiene ciclos (no es un árbol).")
-        return False
-
-    # Cada nodo debe tener como máximo un grado de salida de 1, porque son aristas invertidas (hijo -> padre)
-    for nodo in G.nodes():
-        if G.out_degree(nodo) > 1:
-            print(f"ERROR: El nodo {nodo} tiene más de un padre (no es un árbol puro).")
-            return False
-
-    return True
\ No newline at end of file
+    # Aristas invertidas (hijo -> padre); se informa de todas las violaciones, no solo de la primera
+    hijos = np.fromiter((u for u, _ in G.edges()), dtype=np.int64, count=G.number_of_edges())
+    padres = np.fromiter((v for _, v in G.edges()), dtype=np.int64, count=G.number_of_edges())
+    violaciones = validar_aristas(padres, hijos)
+    _informar(violaciones, origen="arista")
+    return not violaciones
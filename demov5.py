@@ -2,14 +2,54 @@ import networkx as nx
 from lector import leer_entrada
 from imprimir import imprimir_arbol_con_pesos, tabla_comparativa_final
 from generaHTML import exportar_html
+from exportar_tabla import exportar_tabla_paginada, FORMATOS
+from likes_dataset import likes_por_nodo
+from indice_arbol import indice_de
+from consultas_ranking import ranking_de
+from cache_ranking import CacheRanking, pagerank_networkx
+from instrumentacion import instrumentar
+from motor_pagerank import pagerank_aristas, preparar_aristas, aristas_bidireccionales, iteracion_potencia_lote, matriz_personalizacion
+import argparse
 import logging
+import os
 
 
-def version1_sin_pesos(G, alpha=0.85):
+def aristas_version1(G):
+    """Aristas (u, v, peso) de la versión 1: toda la jerarquía en ambos sentidos con peso 1."""
+    aristas = []
+    for u, v in G.edges():
+        aristas.append((u, v, 1.0))
+        aristas.append((v, u, 1.0))
+    return aristas
+
+
+def aristas_version3(G, referencias, peso_libro=2.0, peso_referencia=3.0):
+    """Aristas (u, v, peso) de la versión 3: libros con peso_libro y referencias con peso_referencia."""
+    nodos_hoja = indice_de(G).hojas()
+    referencias_set = set(referencias)
+    aristas = []
+    for u, v in G.edges():
+        if (u, v) not in referencias_set:
+            peso = peso_libro if v in nodos_hoja else 1.0
+            aristas.append((u, v, peso))
+            aristas.append((v, u, peso))
+    for u, v in referencias:
+        aristas.append((u, v, peso_referencia))
+        aristas.append((v, u, peso_referencia))
+    return aristas
+
+
+@instrumentar()
+def version1_sin_pesos(G, alpha=0.85, motor="networkx", cache=None):
     """
     PageRank básico sobre jerarquías bidireccionales.
     Todas las relaciones valen igual.
+    motor: "networkx", "csr" (matriz dispersa) o "arbol" (solver exacto para árboles)
+    cache: CacheRanking opcional; si el mismo cálculo ya se hizo no se repite
     """
+    if motor != "networkx":
+        return pagerank_aristas(G.nodes(), aristas_version1(G), alpha=alpha, motor=motor, cache=cache)
+
     # Crear grafo bidireccional
     G_bi = nx.DiGraph()
     G_bi.add_nodes_from(G.nodes(data=True))
@@ -20,27 +60,26 @@ def version1_sin_pesos(G, alpha=0.85):
         G_bi.add_edge(v, u)
     
     # PageRank sin pesos
-    pr = nx.pagerank(G_bi, alpha=alpha)
+    pr = pagerank_networkx(G_bi, cache, alpha=alpha)
     
     return pr
 
 
-def version4_personalizacion_likes(G, likes_libros, referencias=None, alpha=0.85):
+@instrumentar()
+def version4_personalizacion_likes(G, likes_libros, referencias=None, alpha=0.85, motor="networkx", cache=None):
     """
     PageRank personalizado donde:
     - Cada libro tiene un número de likes (rating)
     - El vector de personalización concentra importancia en los libros
     - Las categorías superiores heredan importancia de sus libros
-    
+    motor: "networkx", "csr" (matriz dispersa) o "arbol" (solver exacto para árboles)
+    cache: CacheRanking opcional; si el mismo cálculo ya se hizo no se repite
     """
-    # Identificar nodos hoja (libros)
-    niveles = [G.nodes[n].get('nivel', 0) for n in G.nodes()]
-    max_nivel = max(niveles) if niveles else 0
-    
-    nodos_hoja = set()
-    for nodo in G.nodes():
-        if G.nodes[nodo].get('nivel', 0) == max_nivel:
-            nodos_hoja.add(nodo)
+    if motor != "networkx":
+        aristas = aristas_bidireccionales(G, referencias)
+        total_likes = sum(likes_libros.values())
+        personalization = {n: likes_libros.get(n, 0) / total_likes for n in G.nodes()}
+        return pagerank_aristas(G.nodes(), aristas, alpha=alpha, personalization=personalization, motor=motor, cache=cache)
     
     # Crear grafo bidireccional
     G_completo = nx.DiGraph()
@@ -73,25 +112,44 @@ def version4_personalizacion_likes(G, likes_libros, referencias=None, alpha=0.85
             personalization[nodo] = 0.0
     
     # PageRank con personalización
-    pr = nx.pagerank(G_completo, alpha=alpha, personalization=personalization)
+    pr = pagerank_networkx(G_completo, cache, alpha=alpha, personalization=personalization)
     
     return pr
 
 
-def version3_con_referencias_y_pesos(G, referencias, peso_libro=2.0, peso_referencia=3.0, alpha=0.85):
+@instrumentar()
+def version4_personalizacion_likes_lote(G, matriz_likes, referencias=None, alpha=0.85):
+    """
+    Versión 4 para muchos usuarios a la vez.
+    - matriz_likes: matriz (nodos x usuarios), densa o dispersa, con las filas
+      en el orden de G.nodes(); cada columna son los likes de un usuario o segmento
+      (como en la versión 4, un usuario sin likes da ValueError)
+    - Todas las columnas se resuelven juntas con un producto disperso por iteración
+    Devuelve la lista de nodos (orden de las filas) y la matriz de scores (nodos x usuarios).
+    """
+    nodos, _, PT, colgantes = preparar_aristas(G.nodes(), aristas_bidireccionales(G, referencias))
+    P = matriz_personalizacion(matriz_likes)
+    scores, _ = iteracion_potencia_lote(PT, colgantes, alpha, P)
+    return nodos, scores
+
+
+@instrumentar()
+def version3_con_referencias_y_pesos(G, referencias, peso_libro=2.0, peso_referencia=3.0, alpha=0.85, motor="networkx",
+                                     cache=None):
     """
     PageRank con:
     - Pesos a libros (nodos hoja)
     - Referencias cruzadas con su propio peso
+    motor: "networkx", "csr" (matriz dispersa) o "arbol" (solver exacto para árboles)
+    cache: CacheRanking opcional; si el mismo cálculo ya se hizo no se repite
     """
-    # Identificar nodos hoja usando nivel máximo
-    niveles = [G.nodes[n].get('nivel', 0) for n in G.nodes()]
-    max_nivel = max(niveles) if niveles else 0
+    # Identificar nodos hoja: nodos sin hijos en el índice del árbol
+    # (no solo los del nivel máximo: un libro puede colgar a menos profundidad)
+    nodos_hoja = indice_de(G).hojas()
     
-    nodos_hoja = set()
-    for nodo in G.nodes():
-        if G.nodes[nodo].get('nivel', 0) == max_nivel:
-            nodos_hoja.add(nodo)
+    if motor != "networkx":
+        aristas = aristas_version3(G, referencias, peso_libro, peso_referencia)
+        return pagerank_aristas(G.nodes(), aristas, alpha=alpha, motor=motor, cache=cache)
     
     # Crear grafo completo
     G_completo = nx.DiGraph()
@@ -112,7 +170,7 @@ def version3_con_referencias_y_pesos(G, referencias, peso_libro=2.0, peso_refere
         G_completo.add_edge(v, u, weight=peso_referencia)
     
     # PageRank con pesos
-    pr = nx.pagerank(G_completo, alpha=alpha, weight='weight')
+    pr = pagerank_networkx(G_completo, cache, alpha=alpha, weight='weight')
     
     return pr
 
@@ -121,7 +179,14 @@ def version3_con_referencias_y_pesos(G, referencias, peso_libro=2.0, peso_refere
 # PROGRAMA PRINCIPAL
 # ============================================================================
 
-G = leer_entrada("entrada.txt")
+# Taxonomía de la demo, junto a este archivo (no depende del directorio de trabajo)
+ENTRADA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "entrada.txt")
+
+
+def cargar_grafo(ruta=ENTRADA):
+    """Lee la taxonomía de ruta (formato de entrada.txt) y devuelve el grafo."""
+    return leer_entrada(ruta)
+
 
 referencias = [
     ("Historical mystery", "Detective mystery"),
@@ -161,17 +226,59 @@ likes_libros = {
     "Love-inspired suspense": 180,
 }
 
-print("EJECUTANDO LAS 3 VERSIONES DEL ALGORITMO")
+# Lo anterior (cargar_grafo, referencias y likes) se puede importar desde otros módulos,
+# como servicio_ranking, sin leer nada; lo siguiente solo se ejecuta al lanzar el script
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ranking de la taxonomía de géneros (versiones 1, 3 y 4)")
+    parser.add_argument("--entrada", default=ENTRADA, help="taxonomía (formato de entrada.txt)")
+    parser.add_argument("--cache", metavar="DIRECTORIO",
+                        help="guarda los rankings en disco para no recalcularlos entre ejecuciones")
+    parser.add_argument("--dataset-likes", metavar="JSONL",
+                        help="JSONL de libros con sus géneros; sus ratings sustituyen a los likes de ejemplo")
+    parser.add_argument("--rankings", metavar="DIRECTORIO",
+                        help="guarda cada ranking con sus estructuras de top-k (consultas_ranking) en DIRECTORIO")
+    parser.add_argument("--tabla", metavar="DIRECTORIO",
+                        help="exporta además la tabla comparativa completa, por páginas, a DIRECTORIO")
+    parser.add_argument("--tabla-formato", choices=FORMATOS, default="csv")
+    parser.add_argument("--filas-por-pagina", type=int, default=10000)
+    args = parser.parse_args()
+
+    G = cargar_grafo(args.entrada)
+
+    # LIKES DESDE EL DATASET LIMPIO (--dataset-likes): los likes pasan a ser la suma
+    # de ratings_count de los libros de cada nodo
+    if args.dataset_likes:
+        likes_libros = likes_por_nodo(args.dataset_likes, G)
+
+    # MOTOR DE CÁLCULO: "networkx", "csr" (matriz dispersa), "arbol" (solver exacto para árboles)
+    # o "acelerado" (Gauss-Seidel con extrapolación, ver solver_acelerado)
+    motor = "networkx"
+
+    # CACHÉ DE RESULTADOS (--cache): si nada ha cambiado (grafo, pesos, alpha, likes) no se vuelve a resolver
+    cache = CacheRanking(directorio=args.cache) if args.cache else None
+
+    print("EJECUTANDO LAS 3 VERSIONES DEL ALGORITMO")
+
+    pr_v1 = version1_sin_pesos(G, motor=motor, cache=cache)
+    pr_v3 = version3_con_referencias_y_pesos(G, referencias, peso_libro=2.0, peso_referencia=3.0, motor=motor, cache=cache)
+    pr_v4 = version4_personalizacion_likes(G, likes_libros, referencias, motor=motor, cache=cache)
+    if cache is not None:
+        logging.info("Caché de rankings: %s", cache.estadisticas())
 
-pr_v1 = version1_sin_pesos(G)
-pr_v3 = version3_con_referencias_y_pesos(G, referencias, peso_libro=2.0, peso_referencia=3.0)
-pr_v4 = version4_personalizacion_likes(G, likes_libros, referencias)
+    # MOSTRAR ÁRBOLES CON PESOS
+    imprimir_arbol_con_pesos(G, pr_v1, "VERSIÓN 1: Sin Pesos (Baseline)")
+    imprimir_arbol_con_pesos(G, pr_v3, "VERSIÓN 3: Con Referencias y Pesos (refs=3x, libros=2x)")
+    imprimir_arbol_con_pesos(G, pr_v4, "VERSIÓN 4: Personalización por Likes")
 
-# MOSTRAR ÁRBOLES CON PESOS
-imprimir_arbol_con_pesos(G, pr_v1, "VERSIÓN 1: Sin Pesos (Baseline)")
-imprimir_arbol_con_pesos(G, pr_v3, "VERSIÓN 3: Con Referencias y Pesos (refs=3x, libros=2x)")
-imprimir_arbol_con_pesos(G, pr_v4, "VERSIÓN 4: Personalización por Likes")
+    tabla_comparativa_final(G, pr_v1, pr_v3, pr_v4)
+    if args.tabla:
+        exportar_tabla_paginada(pr_v1, pr_v3, pr_v4, args.tabla, args.filas_por_pagina, args.tabla_formato)
 
-tabla_comparativa_final(G, pr_v1, pr_v3, pr_v4)
+    exportar_html(G, pr_v1, pr_v3, pr_v4, "index.html")
 
-exportar_html(G, pr_v1, pr_v3, pr_v4, "index.html")
\ No newline at end of file
+    # CONSULTAS DE NAVEGACIÓN (--rankings): cada ranking se guarda con sus estructuras
+    # de top-k (ver consultas_ranking.RankingArbol.cargar)
+    if args.rankings:
+        os.makedirs(args.rankings, exist_ok=True)
+        for nombre, pr in (("v1", pr_v1), ("v3", pr_v3), ("v4", pr_v4)):
+            ranking_de(G, pr).guardar(os.path.join(args.rankings, f"ranking_{nombre}.npz"))
\ No newline at end of file
@@ -0,0 +1,132 @@
+import csv
+import json
+import os
+
+import numpy as np
+
+from generaHTML import CSS_ESTILOS
+
+FORMATOS = ("csv", "json", "html")
+
+
+def columnas_de(nombres):
+    """Cabecera de la tabla para las tres versiones: la segunda y la tercera con su diferencia."""
+    a, b, c = nombres
+    return ["Nodo", a, b, f"Δ {b}", c, f"Δ {c}"]
+
+
+def _vectores(pr1, pr2, pr3):
+    """Los tres diccionarios de scores como arrays alineados con la lista de nodos de pr1."""
+    nodos = list(pr1)
+    vectores = [np.fromiter((pr.get(n, 0) for n in nodos), dtype=np.float64, count=len(nodos))
+                for pr in (pr1, pr2, pr3)]
+    return nodos, vectores
+
+
+def _orden(scores, top_n=None):
+    """Índices de mayor a menor score; con top_n solo se ordenan los top_n primeros."""
+    if top_n is not None and top_n < len(scores):
+        candidatos = np.argpartition(-scores, top_n - 1)[:top_n]
+        return candidatos[np.argsort(-scores[candidatos], kind="stable")]
+    return np.argsort(-scores, kind="stable")
+
+
+def _filas(nodos, vectores, indices):
+    """Filas (nodo, v1, v2, d2, v3, d3) de un bloque de índices."""
+    v1, v2, v3 = (v[indices] for v in vectores)
+    for i, a, b, c in zip(indices.tolist(), v1.tolist(), v2.tolist(), v3.tolist()):
+        yield nodos[i], a, b, b - a, c, c - a
+
+
+def _escribir_csv(ruta, filas, columnas):
+    with open(ruta, "w", encoding="utf-8", newline="") as f:
+        escritor = csv.writer(f)
+        escritor.writerow(columnas)
+        for nodo, v1, v2, d2, v3, d3 in filas:
+            escritor.writerow([nodo, f"{v1:.6f}", f"{v2:.6f}", f"{d2:+.6f}", f"{v3:.6f}", f"{d3:+.6f}"])
+
+
+def _escribir_json(ruta, filas, columnas):
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump([dict(zip(columnas, [str(fila[0])] + list(fila[1:]))) for fila in filas], f, ensure_ascii=False)
+
+
+def _escribir_html(ruta, filas, columnas, pagina, paginas):
+    def celda_diferencia(d):
+        clase = "pos" if d > 0 else ("neg" if d < 0 else "neu")
+        return f'<td class="{clase}">{"+" if d > 0 else ""}{d:.6f}</td>'
+
+    with open(ruta, "w", encoding="utf-8") as f:
+        f.write(f'<!DOCTYPE html>\n<html lang="es">\n<head>\n<meta charset="UTF-8">\n'
+                f'<title>Comparativa - página {pagina + 1} de {paginas}</title>\n{CSS_ESTILOS}</head>\n<body>\n'
+                f'<h2>Comparativa de Diferenciales ({pagina + 1}/{paginas})</h2>\n<div class="table-container">\n<table>\n'
+                f'<thead><tr>{"".join(f"<th>{c}</th>" for c in columnas)}</tr></thead>\n<tbody>\n')
+        for nodo, v1, v2, d2, v3, d3 in filas:
+            f.write(f'<tr><td style="color:#e0e0e0">{nodo}</td><td>{v1:.6f}</td><td>{v2:.6f}</td>'
+                    f'{celda_diferencia(d2)}<td>{v3:.6f}</td>{celda_diferencia(d3)}</tr>\n')
+
+        enlaces = []
+        if pagina > 0:
+            enlaces.append(f'<a href="tabla_{pagina - 1:05d}.html">« anterior</a>')
+        if pagina < paginas - 1:
+            enlaces.append(f'<a href="tabla_{pagina + 1:05d}.html">siguiente »</a>')
+        f.write(f'</tbody>\n</table>\n</div>\n<div class="footer">{" | ".join(enlaces)}</div>\n</body>\n</html>\n')
+
+
+def exportar_tabla_paginada(pr1, pr2, pr3, directorio, filas_por_pagina=10000, formato="csv",
+                            ordenar_por=3, top_n=None, nombres=("V1", "V3", "V4")):
+    """
+    Escribe la tabla comparativa en páginas de filas_por_pagina filas y un indice.json.
+
+    - formato: "csv", "json" o "html" (las páginas HTML enlazan con la anterior y la siguiente)
+    - ordenar_por: versión (1, 2 o 3) por la que se ordenan las filas, de mayor a menor
+    - top_n: exporta solo los top_n mejores nodos
+    - nombres: cabecera de las tres versiones (las diferencias son respecto a la primera)
+    Solo se ordenan arrays de scores; las filas de texto se generan página a página.
+    """
+    if filas_por_pagina < 1:
+        raise ValueError(f"filas_por_pagina tiene que ser al menos 1: {filas_por_pagina}")
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato desconocido '{formato}' (se admite {', '.join(FORMATOS)}).")
+    if ordenar_por not in (1, 2, 3):
+        raise ValueError(f"ordenar_por tiene que ser 1, 2 o 3: {ordenar_por}")
+    if top_n is not None and top_n < 1:
+        raise ValueError(f"top_n tiene que ser al menos 1: {top_n}")
+
+    os.makedirs(directorio, exist_ok=True)
+    columnas = columnas_de(nombres)
+    nodos, vectores = _vectores(pr1, pr2, pr3)
+    scores = vectores[ordenar_por - 1]
+    orden = _orden(scores, top_n)
+
+    paginas = max(1, -(-len(orden) // filas_por_pagina))
+    indice = {
+        "total_filas": int(len(orden)),
+        "filas_por_pagina": filas_por_pagina,
+        "ordenado_por": ordenar_por,
+        "columnas": columnas,
+        "paginas": [],
+    }
+
+    for pagina in range(paginas):
+        bloque = orden[pagina * filas_por_pagina:(pagina + 1) * filas_por_pagina]
+        archivo = f"tabla_{pagina:05d}.{formato}"
+        ruta, filas = os.path.join(directorio, archivo), _filas(nodos, vectores, bloque)
+        if formato == "html":
+            _escribir_html(ruta, filas, columnas, pagina, paginas)
+        elif formato == "json":
+            _escribir_json(ruta, filas, columnas)
+        else:
+            _escribir_csv(ruta, filas, columnas)
+        indice["paginas"].append({
+            "archivo": archivo,
+            "desde": pagina * filas_por_pagina,
+            "hasta": pagina * filas_por_pagina + len(bloque),
+            "score_max": float(scores[bloque[0]]) if len(bloque) else None,
+            "score_min": float(scores[bloque[-1]]) if len(bloque) else None,
+        })
+
+    with open(os.path.join(directorio, "indice.json"), "w", encoding="utf-8") as f:
+        json.dump(indice, f, ensure_ascii=False, indent=2)
+
+    return indice
@@ -0,0 +1,150 @@
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from arreglarJson import dividir_rangos, lineas_rango, unir_partes
+from indice_arbol import indice_de
+
+# Por debajo de este tamaño el filtrado se hace en el propio proceso
+TAM_PARALELO = 8 << 20
+
+RE_TOKEN = re.compile(r"[^\W_]+")
+
+# Matcher del proceso trabajador (se fija una vez con el inicializador del pool)
+_matcher = None
+
+
+def tokenizar(texto):
+    """Palabras en minúsculas; guiones, '&' y signos separan ("hard-boiled" == "hard boiled")."""
+    return RE_TOKEN.findall(texto.lower())
+
+
+def compilar_matcher(G, solo_hojas=False):
+    """
+    Compila los nombres de todos los nodos en un conjunto hash de secuencias de tokens.
+    Devuelve {tupla de tokens: [ids de nodo]} y las longitudes distintas (en tokens), de mayor a menor.
+    El id de un nodo es su posición en G.nodes(), el mismo que usa likes_dataset.
+    Con solo_hojas solo se buscan los libros (hojas): así los géneros intermedios y la raíz
+    no reciben likes directos, como pide la versión 4.
+    """
+    hojas = indice_de(G).hojas() if solo_hojas else None
+    patrones = {}
+    for i, nodo in enumerate(G.nodes()):
+        if hojas is not None and nodo not in hojas:
+            continue
+        clave = tuple(tokenizar(str(nodo)))
+        if clave:
+            patrones.setdefault(clave, []).append(i)
+    largos = sorted({len(clave) for clave in patrones}, reverse=True)
+    return patrones, largos
+
+
+def buscar_generos(texto, matcher):
+    """
+    Ids de los nodos cuyo nombre aparece en el texto como secuencia completa de palabras.
+    Las coincidencias no se solapan: en cada posición gana el nombre más largo y se sigue
+    detrás de él, así "Christian Historical Fiction" no marca también "Historical fiction"
+    ni "Fiction".
+    """
+    patrones, largos = matcher
+    tokens = tokenizar(texto)
+    encontrados = set()
+    i = 0
+    while i < len(tokens):
+        for largo in largos:
+            ids = patrones.get(tuple(tokens[i:i + largo])) if i + largo <= len(tokens) else None
+            if ids:
+                encontrados.update(ids)
+                i += largo
+                break
+        else:
+            i += 1
+    return sorted(encontrados)
+
+
+def _texto_campos(item, campos):
+    """Texto donde buscar géneros: valores de texto, nombres de estanterías y claves de diccionarios."""
+    partes = []
+    for campo in campos:
+        valor = item.get(campo)
+        if isinstance(valor, str):
+            partes.append(valor)
+        elif isinstance(valor, dict):
+            partes.extend(valor.keys())
+        elif isinstance(valor, list):
+            for elemento in valor:
+                partes.append(elemento.get('name', '') if isinstance(elemento, dict) else str(elemento))
+    return " | ".join(partes)
+
+
+def _iniciar_trabajador(matcher):
+    global _matcher
+    _matcher = matcher
+
+
+def _filtrar_rango(ruta, inicio, fin, campos, campo_salida, ruta_parte, matcher=None):
+    """Filtra un rango del JSONL escribiendo en ruta_parte los libros con algún género, etiquetados."""
+    matcher = matcher or _matcher
+    leidos = escritos = 0
+
+    with open(ruta, 'rb') as f, open(ruta_parte, 'w', encoding='utf-8') as salida:
+        for linea in lineas_rango(f, inicio, fin):
+            linea = linea.strip()
+            if not linea:
+                continue
+            leidos += 1
+
+            try:
+                item = json.loads(linea)
+            except json.JSONDecodeError:
+                continue
+
+            generos = buscar_generos(_texto_campos(item, campos), matcher)
+            if generos:
+                item[campo_salida] = generos
+                salida.write(json.dumps(item, ensure_ascii=False))
+                salida.write("\n")
+                escritos += 1
+
+    return leidos, escritos
+
+
+def filtrar_por_generos(entrada, salida, G, campos=('popular_shelves', 'title', 'description'),
+                        campo_salida='generos', procesos=None, partes=None, solo_hojas=False):
+    """
+    Se queda con los libros del JSONL que mencionan algún nodo de la taxonomía G.
+
+    - Los nombres de los nodos se compilan una vez en un matcher de tokens
+      (solo los de las hojas con solo_hojas, ver compilar_matcher)
+    - Cada libro conservado lleva en campo_salida los ids de nodo encontrados
+    - Los archivos grandes se reparten por rangos de bytes entre varios procesos
+    Devuelve estadísticas de la ejecución, incluido el rendimiento en registros/s.
+    """
+    matcher = compilar_matcher(G, solo_hojas)
+    t0 = time.perf_counter()
+
+    if os.path.getsize(entrada) < TAM_PARALELO or procesos == 1:
+        parte = f"{salida}.parte0"
+        resultados = [_filtrar_rango(entrada, 0, os.path.getsize(entrada), campos, campo_salida, parte, matcher)]
+        rutas_partes = [parte]
+    else:
+        procesos = procesos or os.cpu_count() or 1
+        rangos = dividir_rangos(entrada, partes or procesos * 4)
+        rutas_partes = [f"{salida}.parte{i}" for i in range(len(rangos))]
+        with ProcessPoolExecutor(max_workers=procesos, initializer=_iniciar_trabajador, initargs=(matcher,)) as pool:
+            futuros = [pool.submit(_filtrar_rango, entrada, inicio, fin, campos, campo_salida, ruta_parte)
+                       for (inicio, fin), ruta_parte in zip(rangos, rutas_partes)]
+            resultados = [futuro.result() for futuro in futuros]
+
+    unir_partes(rutas_partes, salida)
+    segundos = time.perf_counter() - t0
+
+    leidos = sum(r[0] for r in resultados)
+    return {
+        'leidos': leidos,
+        'escritos': sum(r[1] for r in resultados),
+        'segundos': segundos,
+        'registros_por_segundo': leidos / segundos if segundos > 0 else 0.0,
+    }
@@ -1,6 +1,11 @@
 import os
+import re
+import json
 import networkx as nx
 
+from indice_arbol import indice_de
+from instrumentacion import instrumentar
+
 # Configuraciones de Estilo (CSS)
 CSS_ESTILOS = """
 <style>
@@ -45,47 +50,35 @@ CSS_ESTILOS = """
 </style>
 """
 
-def _generar_string_arbol(G, pr, nodo, prefijo=""):
-    """Función auxiliar recursiva para crear el HTML del árbol"""
-    score = pr.get(nodo, 0)
-    # Detectamos hoja si no tiene hijos salientes en la jerarquía (nivel mayor)
-    nivel_actual = G.nodes[nodo].get('nivel', 0)
-    hijos = [n for n in G.neighbors(nodo) if G.nodes[n].get('nivel', 0) > nivel_actual]
-    es_hoja = len(hijos) == 0
-    
-    css_class = "node-leaf" if es_hoja else "node-name"
-    
-    # HTML de la línea actual
-    html = f"<div class='tree-line'>{prefijo}<span class='{css_class}'>{nodo}</span> <span class='score'>{score:.6f}</span></div>"
-    
-    # Recursión ordenando alfabéticamente
-    hijos.sort()
-    for i, hijo in enumerate(hijos):
-        es_ultimo = (i == len(hijos) - 1)
-        # Recursión añadiendo espacios HTML (&nbsp;) para la indentación visual correcta
-        html += _generar_string_arbol(G, pr, hijo, prefijo + ("&nbsp;&nbsp;&nbsp;&nbsp;" if es_ultimo else "│&nbsp;&nbsp;&nbsp;"))
-        
-    # Reemplazamos conectores ASCII por versiones HTML que no se rompan
-    return html.replace("└── ", "└──&nbsp;").replace("├── ", "├──&nbsp;")
+def _lineas_arbol(pr, raiz, indice, prefijo=""):
+    """Generador iterativo (pila explícita, preorden) de las líneas HTML del árbol, con ids del índice"""
+    nodos, inicio, hijos = indice.nodos, indice.inicio, indice.hijos
+    pila = [(raiz, prefijo)]
+    while pila:
+        i, prefijo = pila.pop()
+        nodo = nodos[i]
+        score = pr.get(nodo, 0)
+        # Detectamos hoja si no tiene hijos en la jerarquía (nivel mayor)
+        css_class = "node-leaf" if indice.hoja[i] else "node-name"
+        yield f"<div class='tree-line'>{prefijo}<span class='{css_class}'>{nodo}</span> <span class='score'>{score:.6f}</span></div>"
 
-def exportar_html(G, pr1, pr2, pr3, nombre_archivo="index.html"):
-    """
-    Función principal a llamar desde tu script.
-    Recibe el Grafo y los 3 diccionarios de PageRank.
-    """
-    print(f"\n--- Generando archivo HTML: {nombre_archivo} ---")
-    
-    # 1. Encontrar raíz (nodo con nivel 0)
-    raices = [n for n in G.nodes if G.nodes[n].get('nivel') == 0]
-    raiz = raices[0] if raices else list(G.nodes)[0]
+        # Se apilan al revés para visitarlos en orden alfabético, con espacios HTML (&nbsp;) para la indentación
+        hijos_nodo = hijos[inicio[i]:inicio[i + 1]].tolist()
+        for k in range(len(hijos_nodo) - 1, -1, -1):
+            es_ultimo = (k == len(hijos_nodo) - 1)
+            pila.append((hijos_nodo[k], prefijo + ("&nbsp;&nbsp;&nbsp;&nbsp;" if es_ultimo else "│&nbsp;&nbsp;&nbsp;")))
 
-    # 2. Generar HTML de los árboles
-    html_v1 = _generar_string_arbol(G, pr1, raiz).replace("└──&nbsp;", "└── ").replace("├──&nbsp;", "├── ")
-    html_v2 = _generar_string_arbol(G, pr2, raiz)
-    html_v3 = _generar_string_arbol(G, pr3, raiz)
+def _raiz(indice):
+    """Id de la raíz (primer nodo con nivel 0, o el primer nodo si no hay ninguno)"""
+    return int(indice.raices[0]) if len(indice.raices) else 0
 
-    # 3. Generar filas de la tabla
-    rows_html = ""
+def _generar_string_arbol(G, pr, nodo, prefijo=""):
+    """HTML del árbol completo como string (para árboles grandes es mejor escribir _lineas_arbol directamente)"""
+    indice = indice_de(G)
+    return "".join(_lineas_arbol(pr, indice.id[nodo], indice, prefijo))
+
+def _filas_tabla(G, pr1, pr2, pr3):
+    """Generador de las filas de la tabla comparativa, ordenadas por la tercera versión"""
     nodos_ordenados = sorted(G.nodes(), key=lambda x: pr3.get(x, 0), reverse=True)
 
     for nodo in nodos_ordenados:
@@ -101,7 +94,7 @@ def exportar_html(G, pr1, pr2, pr3, nombre_archivo="index.html"):
         sign_d2 = "+" if d2 > 0 else ""
         sign_d3 = "+" if d3 > 0 else ""
         
-        rows_html += f"""
+        yield f"""
         <tr>
             <td style="color:#e0e0e0">{nodo}</td>
             <td>{v1:.6f}</td>
@@ -112,22 +105,22 @@ def exportar_html(G, pr1, pr2, pr3, nombre_archivo="index.html"):
         </tr>
         """
 
-    # 4. Ensamblar todo
-    contenido = f"""
+# Plantilla de la página; cada {marcador} se sustituye escribiendo su contenido directamente en el archivo
+PLANTILLA_HTML = """
     <!DOCTYPE html>
     <html lang="es">
     <head>
         <meta charset="UTF-8">
         <title>Resultados TFG PageRank</title>
-        {CSS_ESTILOS}
+        {estilos}
     </head>
     <body>
         <h1>Resultados del Algoritmo PageRank</h1>
         
         <div class="grid-container">
-            <div class="card"><h3>V1: Base</h3>{html_v1}</div>
-            <div class="card"><h3>V3: Referencias</h3>{html_v2}</div>
-            <div class="card"><h3>V4: Likes (nuevo)</h3>{html_v3}</div>
+            <div class="card"><h3>V1: Base</h3>{arbol_v1}</div>
+            <div class="card"><h3>V3: Referencias</h3>{arbol_v2}</div>
+            <div class="card"><h3>V4: Likes (nuevo)</h3>{arbol_v3}</div>
         </div>
         
         <h2>Comparativa de Diferenciales</h2>
@@ -138,15 +131,229 @@ def exportar_html(G, pr1, pr2, pr3, nombre_archivo="index.html"):
                         <th>Nodo</th><th>V1</th><th>V3</th><th>Δ V3</th><th>V4</th><th>Δ V4</th>
                     </tr>
                 </thead>
-                <tbody>{rows_html}</tbody>
+                <tbody>{filas}</tbody>
             </table>
         </div>
         <div class="footer">Generado automáticamente por generador_web.py</div>
     </body>
     </html>
     """
+
+@instrumentar()
+def exportar_html(G, pr1, pr2, pr3, nombre_archivo="index.html", modo="estatico"):
+    """
+    Función principal a llamar desde tu script.
+    Recibe el Grafo y los 3 diccionarios de PageRank.
+    El HTML se escribe en streaming: los árboles y la tabla nunca se acumulan en memoria.
+    Con modo="virtual" se genera la versión para árboles grandes (ver exportar_html_virtual).
+    """
+    if modo == "virtual":
+        return exportar_html_virtual(G, pr1, pr2, pr3, nombre_archivo)
+
+    print(f"\n--- Generando archivo HTML: {nombre_archivo} ---")
     
+    # 1. Índice del árbol, común a los tres árboles
+    indice = indice_de(G)
+
+    # 2. Encontrar raíz (nodo con nivel 0)
+    raiz = _raiz(indice)
+
+    # 3. Contenido de cada marcador de la plantilla
+    contenido = {
+        'estilos': [CSS_ESTILOS],
+        'arbol_v1': _lineas_arbol(pr1, raiz, indice),
+        'arbol_v2': _lineas_arbol(pr2, raiz, indice),
+        'arbol_v3': _lineas_arbol(pr3, raiz, indice),
+        'filas': _filas_tabla(G, pr1, pr2, pr3),
+    }
+
+    # 4. Escribir la plantilla intercalando los fragmentos
+    partes = re.split(r"\{(\w+)\}", PLANTILLA_HTML)
     with open(nombre_archivo, "w", encoding="utf-8") as f:
-        f.write(contenido)
+        for i, parte in enumerate(partes):
+            if i % 2 == 0:
+                f.write(parte)
+            else:
+                f.writelines(contenido[parte])
     
+    print(f"Archivo guardado en: {nombre_archivo}")
+
+
+# ============================================================================
+# VERSIÓN VIRTUAL (árboles de 100k+ nodos)
+# ============================================================================
+
+CSS_VIRTUAL = """
+<style>
+    .tree-line.expandible { cursor: pointer; }
+    .tree-line.expandible:hover .node-name { color: #ffffff; }
+    .mas { color: #bb86fc; cursor: pointer; }
+    .tabla-virtual { height: 600px; overflow-y: auto; position: relative; font-family: 'Consolas', monospace; }
+    .fila { display: grid; grid-template-columns: 3fr repeat(5, 1fr); height: 32px; line-height: 32px; border-bottom: 1px solid #333; padding: 0 10px; }
+    .fila.cabecera { background-color: #2c2c2c; color: #bb86fc; font-weight: bold; }
+    .fila span { overflow: hidden; white-space: nowrap; text-overflow: ellipsis; }
+</style>
+"""
+
+# Renderizador del lado del cliente: los árboles se expanden al hacer clic
+# y la tabla solo pinta las filas que están a la vista
+SCRIPT_VIRTUAL = """
+<script>
+(function () {
+    const D = JSON.parse(document.getElementById('datos').textContent);
+    const ALTO_FILA = 32, MAX_HIJOS = 200, NBSP = '\\u00a0';
+    const versiones = [D.v1, D.v2, D.v3];
+
+    function hijos(n) { return D.hijos.slice(D.inicio[n], D.inicio[n + 1]); }
+    // 6 cifras significativas: en árboles grandes los scores son muy pequeños
+    function cifras(x) { return x.toPrecision(6); }
+
+    function linea(n, prefijo, pr) {
+        const div = document.createElement('div');
+        const esHoja = D.inicio[n] === D.inicio[n + 1];
+        div.className = 'tree-line' + (esHoja ? '' : ' expandible');
+        div.append(prefijo);
+        const nombre = document.createElement('span');
+        nombre.className = esHoja ? 'node-leaf' : 'node-name';
+        nombre.textContent = D.nombres[n];
+        const score = document.createElement('span');
+        score.className = 'score';
+        score.textContent = cifras(pr[n]);
+        div.append(nombre, ' ', score);
+        if (!esHoja) {
+            let abierto = null;
+            div.onclick = function () {
+                if (abierto) { abierto.remove(); abierto = null; return; }
+                abierto = document.createElement('div');
+                pintarHijos(abierto, hijos(n), prefijo, pr, 0);
+                div.after(abierto);
+            };
+        }
+        return div;
+    }
+
+    function pintarHijos(contenedor, lista, prefijo, pr, desde) {
+        const hasta = Math.min(lista.length, desde + MAX_HIJOS);
+        for (let i = desde; i < hasta; i++) {
+            const ultimo = i === lista.length - 1;
+            contenedor.append(linea(lista[i], prefijo + (ultimo ? NBSP.repeat(4) : '\u2502' + NBSP.repeat(3)), pr));
+        }
+        if (hasta < lista.length) {
+            const mas = document.createElement('div');
+            mas.className = 'tree-line mas';
+            mas.textContent = prefijo + '\u2026 ' + (lista.length - hasta) + ' más';
+            mas.onclick = function () { mas.remove(); pintarHijos(contenedor, lista, prefijo, pr, hasta); };
+            contenedor.append(mas);
+        }
+    }
+
+    document.querySelectorAll('.arbol').forEach(function (card, v) {
+        card.append(linea(D.raiz, '', versiones[v]));
+    });
+
+    // Tabla virtual ordenada por la tercera versión
+    const orden = D.v3.map(function (_, i) { return i; }).sort(function (a, b) { return D.v3[b] - D.v3[a]; });
+    const tabla = document.getElementById('tabla');
+    const espacio = document.createElement('div');
+    espacio.style.height = (orden.length * ALTO_FILA) + 'px';
+    const ventana = document.createElement('div');
+    ventana.style.position = 'absolute';
+    ventana.style.left = ventana.style.right = '0';
+    tabla.append(espacio, ventana);
+
+    function celda(texto, clase) {
+        const s = document.createElement('span');
+        s.textContent = texto;
+        if (clase) s.className = clase;
+        return s;
+    }
+    function diferencia(d) {
+        return celda((d > 0 ? '+' : '') + cifras(d), d > 0 ? 'pos' : (d < 0 ? 'neg' : 'neu'));
+    }
+    function pintarTabla() {
+        const primera = Math.floor(tabla.scrollTop / ALTO_FILA);
+        const ultima = Math.min(orden.length, primera + Math.ceil(tabla.clientHeight / ALTO_FILA) + 5);
+        ventana.style.top = (primera * ALTO_FILA) + 'px';
+        ventana.replaceChildren();
+        for (let k = primera; k < ultima; k++) {
+            const n = orden[k], fila = document.createElement('div');
+            fila.className = 'fila';
+            fila.append(celda(D.nombres[n]), celda(cifras(D.v1[n])), celda(cifras(D.v2[n])),
+                        diferencia(D.v2[n] - D.v1[n]), celda(cifras(D.v3[n])), diferencia(D.v3[n] - D.v1[n]));
+            ventana.append(fila);
+        }
+    }
+    tabla.addEventListener('scroll', function () { requestAnimationFrame(pintarTabla); });
+    pintarTabla();
+})();
+</script>
+"""
+
+PLANTILLA_VIRTUAL = """<!DOCTYPE html>
+<html lang="es">
+<head>
+    <meta charset="UTF-8">
+    <title>Resultados TFG PageRank</title>
+    {estilos}
+</head>
+<body>
+    <h1>Resultados del Algoritmo PageRank</h1>
+    <div class="grid-container">
+        <div class="card arbol"><h3>V1: Base</h3></div>
+        <div class="card arbol"><h3>V3: Referencias</h3></div>
+        <div class="card arbol"><h3>V4: Likes (nuevo)</h3></div>
+    </div>
+    <h2>Comparativa de Diferenciales</h2>
+    <div class="table-container">
+        <div class="fila cabecera"><span>Nodo</span><span>V1</span><span>V3</span><span>Δ V3</span><span>V4</span><span>Δ V4</span></div>
+        <div class="tabla-virtual" id="tabla"></div>
+    </div>
+    <div class="footer">Generado automáticamente por generador_web.py</div>
+    <script type="application/json" id="datos">{datos}</script>
+    {script}
+</body>
+</html>
+"""
+
+def _cifras(pr, nodos):
+    # Cifras significativas y no decimales: con muchos nodos los scores bajan de 1e-6
+    return [float(f"{pr.get(n, 0):.6g}") for n in nodos]
+
+def _datos_virtual(G, pr1, pr2, pr3):
+    """Árbol (hijos en formato CSR, tal cual del índice) y los tres vectores de scores, con los nodos como índices."""
+    indice = indice_de(G)
+    nodos = indice.nodos
+    return {
+        'nombres': [str(n) for n in nodos],
+        'inicio': indice.inicio.tolist(),
+        'hijos': indice.hijos.tolist(),
+        'raiz': _raiz(indice),
+        'v1': _cifras(pr1, nodos),
+        'v2': _cifras(pr2, nodos),
+        'v3': _cifras(pr3, nodos),
+    }
+
+@instrumentar()
+def exportar_html_virtual(G, pr1, pr2, pr3, nombre_archivo="index.html"):
+    """
+    Versión del informe para taxonomías grandes.
+    El árbol y los tres vectores de scores se escriben una sola vez como JSON compacto;
+    un script pequeño expande los subárboles al hacer clic y la tabla solo pinta las
+    filas visibles, así el tamaño y la carga dependen de lo que se mira.
+    """
+    print(f"\n--- Generando archivo HTML (virtual): {nombre_archivo} ---")
+
+    # "</" escapado para que ningún nombre pueda cerrar la etiqueta <script>
+    datos = json.dumps(_datos_virtual(G, pr1, pr2, pr3), ensure_ascii=False, separators=(',', ':')).replace("</", "<\\/")
+    contenido = {
+        'estilos': CSS_ESTILOS + CSS_VIRTUAL,
+        'datos': datos,
+        'script': SCRIPT_VIRTUAL,
+    }
+
+    partes = re.split(r"\{(\w+)\}", PLANTILLA_VIRTUAL)
+    with open(nombre_archivo, "w", encoding="utf-8") as f:
+        for i, parte in enumerate(partes):
+            f.write(parte if i % 2 == 0 else contenido[parte])
+
     print(f"Archivo guardado en: {nombre_archivo}")
\ No newline at end of file
@@ -0,0 +1,114 @@
+import hashlib
+import logging
+import os
+import uuid
+
+import numpy as np
+
+# Cambiar si cambia el contenido de los arrays compilados, para invalidar las cachés antiguas
+VERSION_FORMATO = 3
+
+
+def ruta_cache(nombre_archivo):
+    """Archivo .npz donde se guarda la forma compilada de nombre_archivo."""
+    return nombre_archivo + ".cache.npz"
+
+
+def huella_archivo(nombre_archivo):
+    """Hash SHA-1 del archivo fuente, leído por bloques."""
+    h = hashlib.sha1()
+    with open(nombre_archivo, 'rb') as f:
+        for bloque in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def codificar_nombres(nombres):
+    """Tabla de nombres como un único bloque UTF-8 (un nombre por línea), sin objetos de Python."""
+    return np.frombuffer("\n".join(nombres).encode("utf-8"), dtype=np.uint8)
+
+
+def decodificar_nombres(bloque):
+    """Inversa de codificar_nombres."""
+    texto = bloque.tobytes().decode("utf-8")
+    return texto.split("\n") if texto else []
+
+
+def _crear_temporal(ruta):
+    """
+    Crea un temporal nuevo junto a ruta y devuelve (descriptor, nombre). Se abre con
+    permisos 0o666 como open(): el umask del proceso se aplica solo, sin tocarlo.
+    """
+    while True:
+        temporal = f"{ruta}.{uuid.uuid4().hex[:12]}.tmp"
+        try:
+            return os.open(temporal, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0), 0o666), temporal
+        except FileExistsError:
+            continue
+
+
+def _guardar(ruta, arrays):
+    """
+    Escritura atómica: se escribe en un temporal propio del mismo directorio y se renombra,
+    así dos procesos que guardan a la vez no se pisan el temporal. Si falla, el temporal se borra.
+    """
+    descriptor, temporal = _crear_temporal(ruta)
+    try:
+        with os.fdopen(descriptor, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(temporal, ruta)
+    except BaseException:
+        try:
+            os.remove(temporal)
+        except OSError:
+            pass
+        raise
+
+
+def _guardar_cache(ruta, arrays):
+    """La caché es opcional: si no se puede escribir (sin permisos, disco lleno) se sigue sin ella."""
+    try:
+        _guardar(ruta, arrays)
+    except OSError as error:
+        logging.warning("No se pudo guardar la caché compilada %s: %s", ruta, error)
+
+
+def cargar_compilado(nombre_archivo, compilar):
+    """
+    Devuelve los arrays compilados de nombre_archivo, usando la caché en disco si sigue vigente.
+
+    - compilar(nombre_archivo) parsea la fuente y devuelve un dict de arrays de NumPy
+    - Si coinciden fecha de modificación y tamaño se carga directamente
+    - Si cambian pero el hash es el mismo se reutiliza y se actualiza la fecha
+    - En otro caso se recompila y se guarda
+    Si la caché no se puede escribir se devuelven igualmente los arrays recién parseados.
+    """
+    estado = os.stat(nombre_archivo)
+    ruta = ruta_cache(nombre_archivo)
+    formato = f"{compilar.__name__}:{VERSION_FORMATO}"
+    huella = None
+
+    if os.path.exists(ruta):
+        try:
+            with np.load(ruta) as datos:
+                arrays = {k: datos[k] for k in datos.files}
+        except (OSError, ValueError):
+            arrays = {}
+
+        if str(arrays.get('_formato')) == formato:
+            if arrays['_mtime'] == estado.st_mtime_ns and arrays['_tamano'] == estado.st_size:
+                return arrays
+            huella = huella_archivo(nombre_archivo)
+            if str(arrays['_sha1']) == huella:
+                arrays['_mtime'] = np.int64(estado.st_mtime_ns)
+                arrays['_tamano'] = np.int64(estado.st_size)
+                _guardar_cache(ruta, arrays)
+                return arrays
+
+    arrays = compilar(nombre_archivo)
+    arrays['_formato'] = np.str_(formato)
+    arrays['_sha1'] = np.str_(huella or huella_archivo(nombre_archivo))
+    arrays['_mtime'] = np.int64(estado.st_mtime_ns)
+    arrays['_tamano'] = np.int64(estado.st_size)
+    _guardar_cache(ruta, arrays)
+    return arrays
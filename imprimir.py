@@ -1,89 +1,94 @@
 import logging
+import sys
 
-def imprimir_grafo(G, titulo):
-    print(f"\n========== {titulo} ==========")
+from indice_arbol import indice_de
+from instrumentacion import instrumentar
+
+# Líneas que se acumulan antes de escribirlas de una vez en la salida
+TAM_BUFFER = 10000
+
+Azul = "\033[34m"
+Reset = "\033[0m"
+
+def imprimir_grafo(G, titulo, salida=None, max_profundidad=None):
+    salida = salida or sys.stdout
+    salida.write(f"\n========== {titulo} ==========\n")
     
     # Empezar por los nodos que tienen nivel 0 (raíz)
-    raices_reales = [n for n, attr in G.nodes(data=True) if attr.get('nivel') == 0]
+    indice = indice_de(G)
     
     # Usar un for por si hubiera múltiples raíces pero deberia haber una solo
-    for raiz in sorted(raices_reales):
-        print(f"[{raiz}]")
-        _imprimir_recursivo_tree(G, raiz, "")
-
-def _imprimir_recursivo_tree(G, nodo_actual, prefijo):
-    # Obtenemos el nivel del nodo actual para solo ir a niveles superiores
-    nivel_actual = G.nodes[nodo_actual].get('nivel', 0)
-    
-    # Filtramos vecinos que tengan un nivel mayor al actual (para asegurar que bajamos en el árbol)
-    hijos = []
-    for vecino in G.neighbors(nodo_actual):
-        nivel_vecino = G.nodes[vecino].get('nivel', 0)
-        if nivel_vecino > nivel_actual:
-            hijos.append(vecino)
-    
-    hijos.sort() # Orden alfabético para los hermanos
-    num_hijos = len(hijos)
-    
-    for i, hijo in enumerate(hijos):
-        es_ultimo = (i == num_hijos - 1)
-        conector = "└── " if es_ultimo else "├── "
-        
-        print(f"{prefijo}{conector}{hijo}")
-        
-        nuevo_prefijo = prefijo + ("    " if es_ultimo else "│   ")
-        _imprimir_recursivo_tree(G, hijo, nuevo_prefijo)
+    for raiz in sorted(indice.raices.tolist(), key=indice.nodos.__getitem__):
+        nombre = indice.nodos[raiz]
+        _escribir(salida, _lineas_arbol(indice, raiz, f"[{nombre}]", str, max_profundidad))
 
-def imprimir_arbol_con_pesos(G, pr, titulo):
+@instrumentar()
+def imprimir_arbol_con_pesos(G, pr, titulo, salida=None, max_profundidad=None, top_k=None):
     """
     Imprime el árbol con los valores de PageRank al lado de cada nodo
+    - max_profundidad: no baja más de ese número de niveles bajo la raíz
+    - top_k: de cada nodo muestra solo los top_k hijos con mayor PageRank
     """
-    print(f"\n{'='*70}")
-    print(f"{titulo}")
-    print(f"{'='*70}\n")
+    salida = salida or sys.stdout
+    salida.write(f"\n{'='*70}\n{titulo}\n{'='*70}\n\n")
     
     # Empezar por los nodos que tienen nivel 0 (raíz)
-    raices_reales = [n for n, attr in G.nodes(data=True) if attr.get('nivel') == 0]
-    
-    Azul = "\033[34m"
-    Reset = "\033[0m"
+    indice = indice_de(G)
 
-    for raiz in sorted(raices_reales):
-        score = pr.get(raiz, 0)
-        print(f"[{raiz}] {Azul}{score:.6f}{Reset}")
-        _imprimir_recursivo_con_pesos(G, raiz, "", pr)
+    def etiqueta(nodo):
+        return f"{nodo} {Azul}{pr.get(nodo, 0):.6f}{Reset}"
 
+    for raiz in sorted(indice.raices.tolist(), key=indice.nodos.__getitem__):
+        nombre = indice.nodos[raiz]
+        linea_raiz = f"[{nombre}] {Azul}{pr.get(nombre, 0):.6f}{Reset}"
+        _escribir(salida, _lineas_arbol(indice, raiz, linea_raiz, etiqueta, max_profundidad, top_k, pr))
 
-def _imprimir_recursivo_con_pesos(G, nodo_actual, prefijo, pr):
+
+def _lineas_arbol(indice, raiz, linea_raiz, etiqueta, max_profundidad=None, top_k=None, pr=None):
     """
-    Función recursiva para imprimir árbol con pesos
+    Generador iterativo de las líneas del árbol con una pila explícita (sin límite de recursión).
+    Cada entrada de la pila es una línea pendiente y el id del nodo cuyos hijos se expanden después.
+    Los hijos salen del índice CSR (indice_arbol); con top_k se ordenan por PageRank
+    y los que sobran se resumen en una línea.
     """
-    nivel_actual = G.nodes[nodo_actual].get('nivel', 0)
-    
-    # Filtramos vecinos que tengan un nivel mayor al actual
-    hijos = []
-    for vecino in G.neighbors(nodo_actual):
-        nivel_vecino = G.nodes[vecino].get('nivel', 0)
-        if nivel_vecino > nivel_actual:
-            hijos.append(vecino)
-    
-    hijos.sort()
-    num_hijos = len(hijos)
+    nodos, inicio, hijos = indice.nodos, indice.inicio, indice.hijos
+    pila = [(linea_raiz, raiz, "", 0)]
+    while pila:
+        linea, nodo, prefijo, profundidad = pila.pop()
+        yield linea
+        if nodo is None or (max_profundidad is not None and profundidad >= max_profundidad):
+            continue
 
-    Azul = "\033[34m"
-    Reset = "\033[0m"
-    
-    for i, hijo in enumerate(hijos):
-        es_ultimo = (i == num_hijos - 1)
-        conector = "└── " if es_ultimo else "├── "
-        score = pr.get(hijo, 0)
-        
-        print(f"{prefijo}{conector}{hijo} {Azul}{score:.6f}{Reset}")
-        
-        nuevo_prefijo = prefijo + ("    " if es_ultimo else "│   ")
-        _imprimir_recursivo_con_pesos(G, hijo, nuevo_prefijo, pr)
+        hijos_nodo = hijos[inicio[nodo]:inicio[nodo + 1]].tolist()
+        ocultos = 0
+        if top_k is not None and len(hijos_nodo) > top_k:
+            ocultos = len(hijos_nodo) - top_k
+            hijos_nodo = sorted(hijos_nodo, key=lambda h: pr.get(nodos[h], 0), reverse=True)[:top_k]
+
+        if ocultos:
+            pila.append((f"{prefijo}└── … ({ocultos} más)", None, None, None))
+        # Se apilan al revés para que salgan en orden
+        for i in range(len(hijos_nodo) - 1, -1, -1):
+            hijo = hijos_nodo[i]
+            es_ultimo = (i == len(hijos_nodo) - 1) and not ocultos
+            conector = "└── " if es_ultimo else "├── "
+            nuevo_prefijo = prefijo + ("    " if es_ultimo else "│   ")
+            pila.append((f"{prefijo}{conector}{etiqueta(nodos[hijo])}", hijo, nuevo_prefijo, profundidad + 1))
+
+
+def _escribir(salida, lineas):
+    """Escribe las líneas en bloques de TAM_BUFFER con una sola llamada a write por bloque"""
+    bloque = []
+    for linea in lineas:
+        bloque.append(linea)
+        if len(bloque) >= TAM_BUFFER:
+            salida.write("\n".join(bloque) + "\n")
+            bloque = []
+    if bloque:
+        salida.write("\n".join(bloque) + "\n")
 
 
+@instrumentar()
 def tabla_comparativa_final(G, pr_v1, pr_v2, pr_v3):
     """
     Tabla comparativa única y completa de las tres versiones con análisis
@@ -0,0 +1,135 @@
+from itertools import chain
+
+import numpy as np
+
+from instrumentacion import instrumentar
+
+
+class IndiceArbol:
+    """
+    Estructura del árbol calculada una sola vez por grafo, en arrays.
+
+    - nodos / id: nodo <-> id entero (posición en G.nodes())
+    - inicio / hijos: hijos de cada nodo en formato CSR, en el orden en que se muestran
+    - padre, profundidad: árbol del recorrido en profundidad desde las raíces
+    - entrada / salida: tiempos del recorrido de Euler (preorden); el subárbol de v
+      son los nodos orden[entrada[v]:salida[v]]
+    - hoja: nodos sin hijos
+    Un nodo con varios padres (un género repetido, una referencia) aparece en los
+    hijos de todos ellos, pero en el recorrido cuelga solo del primero que lo alcanza.
+    """
+
+    def __init__(self, nodos, listas_hijos, raices):
+        self.nodos = list(nodos)
+        self.id = {n: i for i, n in enumerate(self.nodos)}
+        n = len(self.nodos)
+
+        largos = np.fromiter((len(h) for h in listas_hijos), dtype=np.int64, count=n)
+        self.inicio = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(largos, out=self.inicio[1:])
+        self.hijos = np.fromiter(chain.from_iterable(listas_hijos), dtype=np.int32, count=int(self.inicio[-1]))
+        self.hoja = largos == 0
+        self.raices = np.asarray(raices, dtype=np.int32)
+        self._recorrer()
+
+    def _recorrer(self):
+        """Recorrido en profundidad iterativo: padre, profundidad y tiempos de Euler."""
+        n = len(self.nodos)
+        self.padre = np.full(n, -1, dtype=np.int32)
+        self.profundidad = np.zeros(n, dtype=np.int32)
+        self.entrada = np.full(n, -1, dtype=np.int64)
+        self.salida = np.zeros(n, dtype=np.int64)
+        self.orden = np.zeros(n, dtype=np.int32)
+        inicio, hijos = self.inicio.tolist(), self.hijos.tolist()
+        entrada, salida = self.entrada, self.salida
+        tiempo = 0
+
+        # Primero las raíces; después lo que no cuelgue de ninguna (ciclos)
+        for r in chain(self.raices.tolist(), range(n)):
+            if entrada[r] >= 0:
+                continue
+            pila = [(r, -1, 0)]
+            while pila:
+                v, p, d = pila.pop()
+                if v < 0:
+                    salida[~v] = tiempo
+                    continue
+                if entrada[v] >= 0:
+                    continue
+                entrada[v] = tiempo
+                self.orden[tiempo] = v
+                self.padre[v] = p
+                self.profundidad[v] = d
+                tiempo += 1
+                pila.append((~v, 0, 0))
+                for h in reversed(hijos[inicio[v]:inicio[v + 1]]):
+                    if entrada[h] < 0:
+                        pila.append((h, v, d + 1))
+
+    @classmethod
+    @instrumentar("IndiceArbol.desde_niveles")
+    def desde_niveles(cls, G):
+        """Taxonomía de lector.leer_entrada: hijos = vecinos con 'nivel' mayor, en orden alfabético."""
+        nodos = list(G.nodes())
+        id_nodo = {n: i for i, n in enumerate(nodos)}
+        niveles = [G.nodes[n].get('nivel', 0) for n in nodos]
+        listas = [[id_nodo[v] for v in sorted(v for v in G.neighbors(u) if niveles[id_nodo[v]] > niveles[i])]
+                  for i, u in enumerate(nodos)]
+        raices = [i for i, nivel in enumerate(niveles) if nivel == 0]
+        return cls(nodos, listas, raices)
+
+    @classmethod
+    @instrumentar("IndiceArbol.desde_aristas")
+    def desde_aristas(cls, G, invertidas=False):
+        """
+        Grafo dirigido de demo4: con invertidas=True las aristas van hijo -> padre
+        (hijos = predecesores), si no padre -> hijo (hijos = sucesores).
+        Raíces: nodos sin padre. Los hijos quedan en el orden del grafo.
+        """
+        nodos = list(G.nodes())
+        id_nodo = {n: i for i, n in enumerate(nodos)}
+        vecinos_hijos = G.predecessors if invertidas else G.successors
+        grado_padres = G.out_degree if invertidas else G.in_degree
+        listas = [[id_nodo[v] for v in vecinos_hijos(u)] for u in nodos]
+        raices = [i for i, u in enumerate(nodos) if grado_padres(u) == 0]
+        return cls(nodos, listas, raices)
+
+    def hijos_de(self, i):
+        """Ids de los hijos del nodo con id i."""
+        return self.hijos[self.inicio[i]:self.inicio[i + 1]]
+
+    def subarbol(self, i):
+        """Ids del subárbol de i (incluido), en preorden."""
+        return self.orden[self.entrada[i]:self.salida[i]]
+
+    def hojas(self):
+        """Conjunto de nodos hoja (por nombre)."""
+        return {self.nodos[i] for i in np.flatnonzero(self.hoja)}
+
+
+def indice_de(G, modo="niveles"):
+    """
+    Índice del grafo, guardado en G.graph para construirlo una sola vez.
+    modo: "niveles", "invertidas" (hijo -> padre) o "directas" (padre -> hijo).
+    Se reconstruye si el grafo ha cambiado de tamaño desde la última vez; quien lo cambie
+    sin alterar el número de nodos ni de aristas (sustituir una arista, cambiar un 'nivel')
+    tiene que llamar a invalidar_indice(G).
+    """
+    clave = ("indice_arbol", modo)
+    firma = (G.number_of_nodes(), G.number_of_edges())
+    guardado = G.graph.get(clave)
+    if guardado is not None and guardado[0] == firma:
+        return guardado[1]
+
+    if modo == "niveles":
+        indice = IndiceArbol.desde_niveles(G)
+    else:
+        indice = IndiceArbol.desde_aristas(G, invertidas=(modo == "invertidas"))
+    G.graph[clave] = (firma, indice)
+    return indice
+
+
+def invalidar_indice(G):
+    """Descarta los índices guardados en G.graph (todos los modos) tras modificar el grafo."""
+    for clave in [c for c in G.graph if isinstance(c, tuple) and c[:1] == ("indice_arbol",)]:
+        del G.graph[clave]
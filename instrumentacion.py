@@ -0,0 +1,212 @@
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+
+try:
+    import resource
+except ImportError:  # Windows: sin pico de memoria del proceso
+    resource = None
+
+# Si está definida, la instrumentación se activa al importar y escribe en esa ruta (JSON lines)
+VARIABLE_ENTORNO = "PAGERANK_TELEMETRIA"
+# Registros que se guardan en memoria sin archivo de salida; al pasarse se pierden los más antiguos
+MAX_REGISTROS = 100000
+
+_activo = False
+_salida = None
+_cerrar_salida = False
+_memoria = "rss"
+# Cada hilo tiene su propia pila de etapas; escritura y contadores se comparten con un cerrojo
+_hilo = threading.local()
+_cerrojo = threading.Lock()
+contadores = {}
+# Registros en memoria cuando no hay archivo de salida (ver exportar_jsonl)
+registros = deque(maxlen=MAX_REGISTROS)
+
+
+def _pila():
+    pila = getattr(_hilo, "pila", None)
+    if pila is None:
+        pila = _hilo.pila = []
+    return pila
+
+
+def activo():
+    return _activo
+
+
+def activar(salida=None, memoria="rss"):
+    """
+    Empieza a registrar etapas, cálculos y contadores.
+
+    - salida: ruta o stream donde se escribe un JSON por línea; sin salida se
+      acumulan en registros y se exportan con exportar_jsonl
+    - memoria: "rss" (pico del proceso, sin coste) o "tracemalloc" (pico de cada
+      etapa, más preciso pero ralentiza el programa; con varios hilos el pico es
+      del proceso entero)
+    Se puede usar desde varios hilos: cada uno anida sus propias etapas.
+    """
+    global _activo, _salida, _cerrar_salida, _memoria
+    desactivar()
+    _cerrar_salida = isinstance(salida, str)
+    _salida = open(salida, "a", encoding="utf-8") if _cerrar_salida else salida
+    _memoria = memoria
+    if memoria == "tracemalloc" and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    _activo = True
+
+
+def desactivar():
+    """Vuelca los contadores pendientes y deja de registrar."""
+    global _activo, _salida, _cerrar_salida
+    if not _activo:
+        return
+    volcar_contadores()
+    _activo = False
+    if _cerrar_salida:
+        _salida.close()
+    _salida, _cerrar_salida = None, False
+
+
+def _emitir(registro, ruta=None):
+    registro["ruta"] = ruta if ruta is not None else "/".join(e.nombre for e in _pila())
+    registro["hora"] = time.time()
+    linea = json.dumps(registro, ensure_ascii=False, default=str) + "\n" if _salida is not None else None
+    with _cerrojo:
+        if linea is not None:
+            _salida.write(linea)
+            _salida.flush()
+        else:
+            registros.append(registro)
+
+
+def _rss_pico_kb():
+    # ru_maxrss viene en KB en Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else None
+
+
+class _Etapa:
+    """Una etapa en curso: tiempo de pared y pico de memoria entre __enter__ y __exit__."""
+
+    __slots__ = ("nombre", "datos", "t0", "pico_hijos")
+
+    def __init__(self, nombre, datos):
+        self.nombre = nombre
+        self.datos = datos
+        self.pico_hijos = 0
+
+    def __enter__(self):
+        pila = _pila()
+        if _memoria == "tracemalloc":
+            # El pico se reinicia para esta etapa; el de la etapa padre se guarda antes
+            pico = tracemalloc.get_traced_memory()[1]
+            if pila:
+                pila[-1].pico_hijos = max(pila[-1].pico_hijos, pico)
+            tracemalloc.reset_peak()
+        pila.append(self)
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        segundos = time.perf_counter() - self.t0
+        pila = _pila()
+        if self in pila:
+            # Se quita esta etapa (y las que hubieran quedado encima), no la última a ciegas
+            posicion = len(pila) - 1 - pila[::-1].index(self)
+            ruta = "/".join(e.nombre for e in pila[:posicion + 1])
+            del pila[posicion:]
+        else:
+            # Etapa cerrada desde otro hilo: no está en la pila de este
+            ruta = self.nombre
+        registro = {"tipo": "etapa", "nombre": self.nombre, "segundos": segundos}
+        if _memoria == "tracemalloc":
+            pico = max(tracemalloc.get_traced_memory()[1], self.pico_hijos)
+            if pila:
+                pila[-1].pico_hijos = max(pila[-1].pico_hijos, pico)
+            registro["memoria_pico_kb"] = pico // 1024
+        else:
+            registro["rss_pico_kb"] = _rss_pico_kb()
+        if tipo is not None:
+            registro["error"] = tipo.__name__
+        registro.update(self.datos)
+        _emitir(registro, ruta)
+        return False
+
+
+class _Nada:
+    """Contexto vacío que se devuelve cuando la instrumentación está desactivada."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        return False
+
+
+_NADA = _Nada()
+
+
+def etapa(nombre, **datos):
+    """Contexto que mide una etapa: with etapa("parseo"): ..."""
+    if not _activo:
+        return _NADA
+    return _Etapa(nombre, datos)
+
+
+def instrumentar(nombre=None):
+    """Decorador: cada llamada a la función se mide como una etapa (por defecto con su nombre)."""
+    def decorador(funcion):
+        etiqueta = nombre or funcion.__name__
+
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            if not _activo:
+                return funcion(*args, **kwargs)
+            with _Etapa(etiqueta, {}):
+                return funcion(*args, **kwargs)
+        return envoltura
+    return decorador
+
+
+def contar(nombre, n=1):
+    if _activo:
+        with _cerrojo:
+            contadores[nombre] = contadores.get(nombre, 0) + n
+
+
+def registrar_calculo(metodo, nodos, iteraciones=None, residuo=None, **datos):
+    """Telemetría de un cálculo de PageRank: método, tamaño, iteraciones y residuo final."""
+    if _activo:
+        registro = {"tipo": "calculo", "metodo": metodo, "nodos": nodos,
+                    "iteraciones": iteraciones, "residuo": residuo}
+        registro.update(datos)
+        _emitir(registro)
+
+
+def volcar_contadores():
+    """Escribe los contadores acumulados como un registro y los pone a cero."""
+    if _activo and contadores:
+        with _cerrojo:
+            valores = dict(contadores)
+            contadores.clear()
+        _emitir({"tipo": "contadores", "valores": valores})
+
+
+def exportar_jsonl(ruta):
+    """Escribe (añadiendo) los registros acumulados en memoria como JSON lines y los vacía."""
+    with _cerrojo:
+        pendientes = list(registros)
+        registros.clear()
+    with open(ruta, "a", encoding="utf-8") as f:
+        for registro in pendientes:
+            f.write(json.dumps(registro, ensure_ascii=False, default=str) + "\n")
+
+
+if os.environ.get(VARIABLE_ENTORNO):
+    activar(os.environ[VARIABLE_ENTORNO])
+atexit.register(desactivar)
@@ -1,31 +1,96 @@
+from array import array
+
 import networkx as nx
+import numpy as np
 
-def leer_entrada(nombre_archivo):
-    G = nx.DiGraph()
-    last_nodes = {}
+from grafo_compilado import cargar_compilado, codificar_nombres, decodificar_nombres
+from instrumentacion import instrumentar
+
+@instrumentar()
+def leer_entrada(nombre_archivo, cache=True):
+    """Lee la taxonomía indentada y devuelve el DiGraph bidireccional con el atributo 'nivel'."""
+    return grafo_desde_compilado(leer_arrays(nombre_archivo, cache))
+
+@instrumentar()
+def leer_arrays(nombre_archivo, cache=True):
+    """
+    Igual que leer_entrada pero sin construir NetworkX: devuelve los arrays
+    por línea (nodo, nivel, padre) y la tabla de nombres.
+    Con caché se usa la forma compilada (.cache.npz) si el archivo no ha cambiado.
+    """
+    if cache:
+        return cargar_compilado(nombre_archivo, compilar_taxonomia)
+    return compilar_taxonomia(nombre_archivo)
+
+def recorrer_entrada(nombre_archivo):
+    """
+    Generador que recorre el archivo línea a línea y produce (nombre, nivel, padre).
+    Una pila con la cadena de ancestros abiertos da el padre en O(1) amortizado:
+    se desapilan los niveles >= al actual y el padre es la cima (None en la raíz).
+    """
+    pila = []
 
     with open(nombre_archivo, 'r') as f:
         for line in f:
             # Ignoramos líneas vacías
             stripped = line.strip()
             if not stripped: continue
-            
+
             # Limpiamos el nombre del nodo si tiene asteriscos
             node_name = stripped.replace("**", "").strip()
 
             # Calculamos el nivel segun la cantidad de tabs (0 para la raíz, >0 para hijos)
             indent = len(line) - len(line.lstrip())
-            
-            # Guardamos el nodo con su atributo de nivel
-            G.add_node(node_name, nivel=indent)
-            last_nodes[indent] = node_name
-            
-            if indent > 0:
-                # Buscamos el padre en el nivel superior más cercano
-                parent_levels = [lvl for lvl in last_nodes.keys() if lvl < indent]
-                if parent_levels:
-                    parent_name = last_nodes[max(parent_levels)]
-                    # Creamos la relación bidireccional
-                    G.add_edge(parent_name, node_name)
-                    G.add_edge(node_name, parent_name)
-    return G
\ No newline at end of file
+
+            while pila and pila[-1][0] >= indent:
+                pila.pop()
+            padre = pila[-1][1] if pila else None
+            pila.append((indent, node_name))
+
+            yield node_name, indent, padre
+
+@instrumentar()
+def compilar_taxonomia(nombre_archivo):
+    """
+    Parsea el archivo indentado a arrays: por cada línea el id del nodo, su nivel
+    y el id de su padre (-1 si no tiene), más la tabla de nombres en orden de aparición.
+    Los arrays se acumulan en array('i') para no guardar un objeto de Python por línea.
+    """
+    nombres, ids = [], {}
+    nodo, nivel, padre = array('i'), array('i'), array('i')
+
+    for node_name, indent, parent_name in recorrer_entrada(nombre_archivo):
+        if node_name not in ids:
+            ids[node_name] = len(nombres)
+            nombres.append(node_name)
+        nodo.append(ids[node_name])
+        nivel.append(indent)
+        padre.append(ids[parent_name] if parent_name is not None else -1)
+
+    return {
+        'nombres': codificar_nombres(nombres),
+        'nodo': np.frombuffer(nodo, dtype=np.int32),
+        'nivel': np.frombuffer(nivel, dtype=np.int32),
+        'padre': np.frombuffer(padre, dtype=np.int32),
+    }
+
+@instrumentar()
+def grafo_desde_compilado(datos):
+    """Reconstruye el mismo DiGraph que leer_entrada(cache=False) a partir de los arrays compilados."""
+    nombres = decodificar_nombres(datos['nombres'])
+    nodo, nivel, padre = datos['nodo'], datos['nivel'], datos['padre']
+
+    # Cada nodo se queda con el nivel de su última aparición
+    _, ultimos = np.unique(nodo[::-1], return_index=True)
+    nivel_final = nivel[len(nodo) - 1 - ultimos]
+
+    G = nx.DiGraph()
+    G.add_nodes_from((nombre, {'nivel': int(n)}) for nombre, n in zip(nombres, nivel_final.tolist()))
+
+    con_padre = padre >= 0
+    aristas = []
+    for p, h in zip(padre[con_padre].tolist(), nodo[con_padre].tolist()):
+        aristas.append((nombres[p], nombres[h]))
+        aristas.append((nombres[h], nombres[p]))
+    G.add_edges_from(aristas)
+    return G
@@ -0,0 +1,93 @@
+import json
+from array import array
+
+import numpy as np
+
+# Pares (nodo, peso) que se acumulan antes de volcarlos al vector de likes
+TAM_LOTE = 1 << 20
+
+
+def normalizar(nombre):
+    """Clave del índice: nombre sin mayúsculas ni espacios sobrantes."""
+    return " ".join(str(nombre).split()).lower()
+
+
+def indice_nodos(G):
+    """Índice hash nombre normalizado -> id de nodo (posición en G.nodes())."""
+    nodos = list(G.nodes())
+    indice = {normalizar(n): i for i, n in enumerate(nodos)}
+    return nodos, indice
+
+
+def _numero(valor):
+    """Valor numérico de un campo del JSON (en el dataset a veces viene como texto), o None."""
+    if isinstance(valor, bool):
+        return None
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+def agregar_likes(ruta, G, campo='generos', ponderar_media=False):
+    """
+    Recorre una vez el JSONL de libros y suma sus ratings en cada nodo de la taxonomía.
+
+    - campo: lista de géneros de cada libro, por nombre o por id de nodo
+      (por ejemplo, la que añade el filtrado por géneros)
+    - ponderar_media: multiplica ratings_count por average_rating
+    Cada línea se lee con json.loads (las que no son un objeto JSON se saltan), así los
+    títulos o géneros con comillas escapadas o corchetes no confunden a la lectura.
+    Un libro con varios géneros suma en todos ellos. Los pares (nodo, peso) se
+    vuelcan al vector cada TAM_LOTE, así la memoria no crece con el dataset.
+    Devuelve la lista de nodos y el vector de likes alineado con ella.
+    """
+    nodos, indice = indice_nodos(G)
+    likes = np.zeros(len(nodos))
+    ids, pesos = array('q'), array('d')
+
+    with open(ruta, 'rb') as f:
+        for linea in f:
+            try:
+                libro = json.loads(linea)
+            except ValueError:
+                continue
+            if not isinstance(libro, dict):
+                continue
+            generos = libro.get(campo)
+            peso = _numero(libro.get('ratings_count'))
+            if not isinstance(generos, list) or peso is None:
+                continue
+            if ponderar_media:
+                peso *= _numero(libro.get('average_rating')) or 0.0
+
+            for genero in generos:
+                if isinstance(genero, int) and not isinstance(genero, bool):
+                    nodo = genero if 0 <= genero < len(nodos) else None
+                elif isinstance(genero, str):
+                    nodo = indice.get(normalizar(genero))
+                else:
+                    nodo = None
+                if nodo is None:
+                    continue
+                ids.append(nodo)
+                pesos.append(peso)
+
+            if len(ids) >= TAM_LOTE:
+                _volcar(likes, ids, pesos)
+                ids, pesos = array('q'), array('d')
+
+    _volcar(likes, ids, pesos)
+    return nodos, likes
+
+
+def _volcar(likes, ids, pesos):
+    """Suma en likes los pares (nodo, peso) acumulados."""
+    if len(ids):
+        likes += np.bincount(np.frombuffer(ids, dtype=np.int64), weights=np.frombuffer(pesos), minlength=len(likes))
+
+
+def likes_por_nodo(ruta, G, campo='generos', ponderar_media=False):
+    """Likes agregados en el formato de likes_libros de demov5 (solo nodos con likes)."""
+    nodos, likes = agregar_likes(ruta, G, campo, ponderar_media)
+    return {nodos[i]: float(likes[i]) for i in np.flatnonzero(likes)}
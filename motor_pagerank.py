@@ -0,0 +1,260 @@
+import logging
+
+import numpy as np
+import scipy.sparse as sp
+
+from solver_arbol import resolver_arbol
+from solver_acelerado import iteracion_acelerada
+from cache_ranking import clave_matriz
+from instrumentacion import instrumentar, registrar_calculo
+
+# Diferencia máxima admitida entre el motor CSR y nx.pagerank (ver benchmark_escala)
+TOLERANCIA_NX = 1.0e-6
+
+MOTORES = ("csr", "arbol", "acelerado")
+
+
+def indexar_nodos(nodos):
+    """Asigna un id entero consecutivo a cada nodo, respetando el orden de entrada."""
+    nodos = list(nodos)
+    indice = {n: i for i, n in enumerate(nodos)}
+    return nodos, indice
+
+
+def construir_matriz(n, origenes, destinos, pesos=None):
+    """
+    Construye la matriz de transición traspuesta en formato CSR.
+
+    Si una arista aparece repetida se queda con el último peso, igual que
+    hace nx.DiGraph al volver a llamar a add_edge.
+    Devuelve la matriz (destino x origen) y la máscara de nodos sin salida.
+    """
+    origenes = np.asarray(origenes, dtype=np.int64)
+    destinos = np.asarray(destinos, dtype=np.int64)
+    if pesos is None:
+        pesos = np.ones(len(origenes), dtype=np.float64)
+    else:
+        pesos = np.asarray(pesos, dtype=np.float64)
+
+    # Eliminar duplicados quedándonos con la última aparición
+    clave = origenes * n + destinos
+    _, ultimos = np.unique(clave[::-1], return_index=True)
+    sel = len(clave) - 1 - ultimos
+    origenes, destinos, pesos = origenes[sel], destinos[sel], pesos[sel]
+
+    # Normalizar por el peso total de salida de cada origen
+    salida = np.bincount(origenes, weights=pesos, minlength=n)
+    colgantes = salida == 0
+    valores = pesos / salida[origenes]
+
+    PT = sp.csr_matrix((valores, (destinos, origenes)), shape=(n, n))
+    return PT, colgantes
+
+
+def construir_componentes(n, componentes):
+    """
+    Prepara una sola vez varias componentes de aristas (origenes, destinos) sobre un patrón común.
+
+    Sirve para barrer pesos sin reconstruir el grafo: cada combinación de pesos
+    solo recalcula los valores de la matriz. Si una arista está en varias
+    componentes se queda en la última, igual que al añadirlas en orden a un DiGraph.
+    """
+    origenes = np.concatenate([np.asarray(o, dtype=np.int64) for o, _ in componentes])
+    destinos = np.concatenate([np.asarray(d, dtype=np.int64) for _, d in componentes])
+    componente = np.concatenate([np.full(len(o), k) for k, (o, _) in enumerate(componentes)])
+
+    clave = origenes * n + destinos
+    _, ultimos = np.unique(clave[::-1], return_index=True)
+    sel = len(clave) - 1 - ultimos
+    origenes, destinos, componente = origenes[sel], destinos[sel], componente[sel]
+
+    # Patrón CSR de la traspuesta: filas = destino, columnas = origen
+    orden = np.lexsort((origenes, destinos))
+    origenes, destinos, componente = origenes[orden], destinos[orden], componente[orden]
+    indptr = np.searchsorted(destinos, np.arange(n + 1))
+
+    return {"n": n, "indptr": indptr, "indices": origenes, "componente": componente}
+
+
+def combinar_componentes(estructura, pesos):
+    """Matriz de transición traspuesta para un peso por componente, reutilizando el patrón."""
+    n, indices = estructura["n"], estructura["indices"]
+    w = np.asarray(pesos, dtype=np.float64)[estructura["componente"]]
+
+    salida = np.bincount(indices, weights=w, minlength=n)
+    colgantes = salida == 0
+    valores = np.divide(w, salida[indices], out=np.zeros_like(w), where=salida[indices] > 0)
+
+    PT = sp.csr_matrix((valores, indices, estructura["indptr"]), shape=(n, n))
+    return PT, colgantes
+
+
+def vector_personalizacion(indice, personalization=None):
+    """
+    Convierte el diccionario de personalización en un vector normalizado.
+    Si no da peso a ningún nodo del grafo no hay vector posible: ValueError.
+    """
+    n = len(indice)
+    if personalization is None:
+        return np.full(n, 1.0 / n)
+    p = np.zeros(n)
+    for nodo, valor in personalization.items():
+        if nodo in indice:
+            p[indice[nodo]] = valor
+    total = p.sum()
+    if total == 0:
+        raise ValueError("La personalización no da peso a ningún nodo del grafo.")
+    return p / total
+
+
+@instrumentar()
+def iteracion_potencia(PT, colgantes, alpha=0.85, p=None, x0=None, tol=1.0e-6, max_iter=100):
+    """
+    Iteración de potencias vectorizada con el mismo criterio de parada que nx.pagerank.
+
+    Los nodos sin salida reparten su masa según el vector de personalización.
+    Devuelve el vector de scores, el número de iteraciones y el error final.
+    """
+    n = PT.shape[0]
+    if p is None:
+        p = np.full(n, 1.0 / n)
+    x = np.full(n, 1.0 / n) if x0 is None else np.asarray(x0, dtype=np.float64) / np.sum(x0)
+
+    for iteracion in range(1, max_iter + 1):
+        xlast = x
+        x = alpha * (PT @ x + x[colgantes].sum() * p) + (1 - alpha) * p
+        error = np.abs(x - xlast).sum()
+        if error < n * tol:
+            registrar_calculo("potencia", n, iteracion, float(error), alpha=alpha)
+            return x, iteracion, error
+
+    registrar_calculo("potencia", n, max_iter, float(error), alpha=alpha, convergido=False)
+    raise RuntimeError(f"PageRank no converge en {max_iter} iteraciones (error {error:.2e}).")
+
+
+@instrumentar()
+def iteracion_potencia_lote(PT, colgantes, alpha=0.85, P=None, X0=None, tol=1.0e-6, max_iter=100):
+    """
+    Resuelve a la vez un PageRank por cada columna de P (n x k).
+
+    Cada iteración es un único producto matriz dispersa x matriz densa.
+    Las columnas que ya han convergido se congelan, así cada una da el mismo
+    resultado que iteracion_potencia con su vector de personalización.
+    Devuelve la matriz de scores (n x k) y el número de iteraciones.
+    """
+    n, k = PT.shape[0], P.shape[1]
+    X = np.full((n, k), 1.0 / n) if X0 is None else np.array(X0, dtype=np.float64) / np.sum(X0, axis=0)
+    activas = np.arange(k)
+
+    for iteracion in range(1, max_iter + 1):
+        Xa, Pa = X[:, activas], P[:, activas]
+        Xn = alpha * (PT @ Xa + Xa[colgantes].sum(axis=0) * Pa) + (1 - alpha) * Pa
+        error = np.abs(Xn - Xa).sum(axis=0)
+        X[:, activas] = Xn
+        activas = activas[error >= n * tol]
+        if len(activas) == 0:
+            registrar_calculo("potencia_lote", n, iteracion, float(error.max()), alpha=alpha, columnas=k)
+            return X, iteracion
+
+    raise RuntimeError(f"PageRank no converge en {max_iter} iteraciones ({len(activas)} columnas pendientes).")
+
+
+def matriz_personalizacion(P):
+    """
+    Normaliza cada columna de P, como vector_personalizacion con cada usuario.
+    Una columna sin peso en ningún nodo no tiene vector posible: ValueError.
+    """
+    P = P.toarray() if sp.issparse(P) else np.array(P, dtype=np.float64)
+    totales = P.sum(axis=0)
+    vacias = np.flatnonzero(totales == 0)
+    if len(vacias):
+        raise ValueError(f"La personalización de las columnas {vacias[:10].tolist()} no da peso a ningún nodo del grafo.")
+    return P / totales
+
+
+def aristas_bidireccionales(G, referencias=None):
+    """Aristas (u, v, peso) de la versión 4 de demov5: jerarquía y referencias en ambos sentidos."""
+    referencias_set = set(referencias) if referencias else set()
+    aristas = []
+    for u, v in G.edges():
+        if (u, v) not in referencias_set:
+            aristas.append((u, v, 1.0))
+            aristas.append((v, u, 1.0))
+    for u, v in referencias or []:
+        aristas.append((u, v, 1.0))
+        aristas.append((v, u, 1.0))
+    return aristas
+
+
+@instrumentar()
+def preparar_aristas(nodos, aristas):
+    """Indexa los nodos y construye la matriz a partir de una lista de aristas (u, v, peso)."""
+    nodos, indice = indexar_nodos(nodos)
+    origenes = np.fromiter((indice[u] for u, _, _ in aristas), dtype=np.int64, count=len(aristas))
+    destinos = np.fromiter((indice[v] for _, v, _ in aristas), dtype=np.int64, count=len(aristas))
+    pesos = np.fromiter((w for _, _, w in aristas), dtype=np.float64, count=len(aristas))
+
+    PT, colgantes = construir_matriz(len(nodos), origenes, destinos, pesos)
+    return nodos, indice, PT, colgantes
+
+
+def pagerank_aristas(nodos, aristas, alpha=0.85, personalization=None, tol=1.0e-6, max_iter=100, motor="csr",
+                     cache=None, opciones=None):
+    """
+    PageRank sobre una lista de aristas (u, v, peso) sin construir un nx.DiGraph.
+
+    El resultado es el mismo que añadir esas aristas en orden a un DiGraph
+    y llamar a nx.pagerank(G, weight='weight').
+    motor "arbol" usa el solver exacto para árboles con pocas referencias, en
+    O(n + s * profundidad * s) para s extremos de referencias, y vuelve a la
+    iteración de potencias si s > solver_arbol.MAX_CORRECCIONES; motor "acelerado" usa
+    solver_acelerado.iteracion_acelerada (por defecto Gauss-Seidel con extrapolación
+    de Aitken) con las opciones que se den en opciones (metodo, extrapolacion, parada,
+    tol_adaptativa, top_k, estable, comparar); su resumen (iteraciones, residuo,
+    iteraciones ahorradas) se registra con logging.info.
+    Con cache (cache_ranking.CacheRanking) un cálculo ya hecho no se repite.
+    """
+    nodos, indice, PT, colgantes = preparar_aristas(nodos, aristas)
+    opciones = opciones or {}
+
+    def resolver():
+        return _resolver_preparado(nodos, indice, PT, colgantes, alpha, personalization, tol, max_iter, motor, opciones)
+
+    if cache is not None:
+        # Las opciones del motor acelerado cambian el resultado: forman parte de la clave
+        etiqueta = f"{motor}:{sorted(opciones.items())!r}" if opciones else motor
+        clave = clave_matriz(nodos, PT, alpha, personalization, tol, max_iter, etiqueta)
+        return cache.obtener_o_calcular(clave, resolver)
+    return resolver()
+
+
+def _resolver_preparado(nodos, indice, PT, colgantes, alpha, personalization, tol, max_iter, motor, opciones=None):
+    if motor not in MOTORES:
+        raise ValueError(f"Motor desconocido '{motor}' (se admite {', '.join(MOTORES)}).")
+    p = vector_personalizacion(indice, personalization)
+    if motor == "arbol":
+        x = resolver_arbol(PT, alpha, p)
+        if x is not None:
+            return dict(zip(nodos, x.tolist()))
+    if motor == "acelerado":
+        x, info = iteracion_acelerada(PT, colgantes, alpha, p, tol=tol, max_iter=max_iter, **(opciones or {}))
+        logging.info("PageRank acelerado: %s", info)
+        return dict(zip(nodos, x.tolist()))
+    x, _, _ = iteracion_potencia(PT, colgantes, alpha, p, tol=tol, max_iter=max_iter)
+    return dict(zip(nodos, x.tolist()))
+
+
+def pagerank(G, alpha=0.85, personalization=None, weight='weight', tol=1.0e-6, max_iter=100, cache=None):
+    """Sustituto directo de nx.pagerank para un grafo de NetworkX ya construido."""
+    aristas = [(u, v, d.get(weight, 1.0) if weight else 1.0) for u, v, d in G.edges(data=True)]
+    return pagerank_aristas(G.nodes(), aristas, alpha, personalization, tol, max_iter, cache=cache)
+
+
+def diferencia_maxima(pr_a, pr_b):
+    """Mayor diferencia absoluta entre dos diccionarios de PageRank."""
+    return max(abs(pr_a[n] - pr_b.get(n, 0.0)) for n in pr_a)
+
+
+def diferencia_l1(pr_a, pr_b):
+    """Suma de las diferencias absolutas entre dos diccionarios de PageRank (la norma de la parada)."""
+    return sum(abs(pr_a[n] - pr_b.get(n, 0.0)) for n in pr_a)
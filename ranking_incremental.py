@@ -0,0 +1,183 @@
+from collections import deque, Counter
+
+import numpy as np
+import scipy.sparse as sp
+
+from motor_pagerank import preparar_aristas, aristas_bidireccionales, iteracion_potencia
+
+
+class RankingLikes:
+    """
+    Ranking de la versión 4 (personalización por likes) que se mantiene vivo
+    entre actualizaciones, en lugar de recalcularse desde cero con cada like.
+
+    Guarda la matriz preparada y la última solución. Como el PageRank
+    normalizado es proporcional a y = (I - alpha*P^T)^-1 * likes, un cambio de
+    likes se puede corregir localmente empujando (push) solo la diferencia.
+    Lo mismo vale para añadir o quitar una referencia: solo cambian las filas
+    de P de sus dos extremos y el residuo que generan se empuja igual.
+    """
+
+    def __init__(self, G, likes_libros, referencias=None, alpha=0.85, tol=1.0e-6):
+        self.alpha = alpha
+        self.tol = tol
+        self.nodos, self.indice, PT, self.colgantes = preparar_aristas(
+            G.nodes(), aristas_bidireccionales(G, referencias))
+        # Aristas de salida por nodo (filas de P); PT es solo una vista traspuesta
+        self.P = PT.T.tocsr()
+        self.PT = self.P.T
+
+        # Aristas dirigidas de la jerarquía y de las referencias, para saber qué sobrevive a un borrado
+        referencias_set = set(referencias) if referencias else set()
+        self.jerarquia = set()
+        for u, v in G.edges():
+            if (u, v) not in referencias_set:
+                self.jerarquia.add((self.indice[u], self.indice[v]))
+                self.jerarquia.add((self.indice[v], self.indice[u]))
+        self.referencias = Counter()
+        for u, v in referencias or []:
+            self.referencias[self.indice[u], self.indice[v]] += 1
+            self.referencias[self.indice[v], self.indice[u]] += 1
+
+        self.likes = np.zeros(len(self.nodos))
+        for nodo, valor in likes_libros.items():
+            self.likes[self.indice[nodo]] = valor
+        self._resolver_completo()
+
+    def _resolver_completo(self, x0=None):
+        """Iteración de potencias (en caliente si hay x0) y reinicio del estado del push."""
+        p = self.likes / self.likes.sum()
+        self.x, iteraciones, _ = iteracion_potencia(self.PT, self.colgantes, self.alpha, p, x0=x0, tol=self.tol)
+        if x0 is None:
+            # Coste de referencia: una resolución completa desde el vector uniforme
+            self.operaciones_completo = iteraciones * self.PT.nnz
+
+        # y sin normalizar y residuo pendiente de empujar
+        c = self.alpha * self.x[self.colgantes].sum() + (1 - self.alpha)
+        self.y = self.likes.sum() * self.x / c
+        self.residuo = np.zeros(len(self.nodos))
+        return iteraciones
+
+    def _push(self):
+        """Propaga el residuo por las aristas de salida hasta dejarlo bajo el umbral."""
+        umbral = self.tol * self.likes.sum()
+        indptr, indices, datos = self.P.indptr, self.P.indices, self.P.data
+        cola = deque(np.flatnonzero(np.abs(self.residuo) > umbral).tolist())
+        operaciones = 0
+
+        while cola:
+            u = cola.popleft()
+            r = self.residuo[u]
+            if abs(r) <= umbral:
+                continue
+            self.y[u] += r
+            self.residuo[u] = 0.0
+            # Los nodos sin salida no propagan: su reparto va incluido en la normalización final
+            destinos = indices[indptr[u]:indptr[u + 1]]
+            self.residuo[destinos] += self.alpha * r * datos[indptr[u]:indptr[u + 1]]
+            operaciones += len(destinos)
+            cola.extend(destinos[np.abs(self.residuo[destinos]) > umbral].tolist())
+
+        return operaciones
+
+    def actualizar_likes(self, cambios, metodo="auto", umbral_push=0.01):
+        """
+        Aplica un cambio de likes {nodo: incremento} y refresca el ranking.
+        - metodo "push": corrección local de la diferencia
+        - metodo "caliente": iteración de potencias desde la solución anterior
+        - metodo "auto": push si el cambio es menor que umbral_push del total
+        Devuelve un resumen del trabajo realizado frente a una resolución completa.
+        """
+        delta = np.zeros(len(self.nodos))
+        for nodo, incremento in cambios.items():
+            delta[self.indice[nodo]] += incremento
+        self.likes += delta
+        self.residuo += delta
+        return self._refrescar(metodo, umbral_push)
+
+    def anadir_referencia(self, u, v, metodo="auto", umbral_push=0.01):
+        """Añade la referencia bidireccional u <-> v parcheando la matriz y refresca el ranking."""
+        if u == v:
+            raise ValueError(f"Un nodo no puede referenciarse a sí mismo ({u}).")
+        i, j = self.indice[u], self.indice[v]
+        self.referencias[i, j] += 1
+        self.referencias[j, i] += 1
+        return self._refrescar(metodo, umbral_push, self._parchear_par(i, j))
+
+    def eliminar_referencia(self, u, v, metodo="auto", umbral_push=0.01):
+        """Quita la referencia u <-> v; la arista se mantiene si también es jerárquica u otra referencia."""
+        i, j = self.indice[u], self.indice[v]
+        if i == j or self.referencias[i, j] == 0:
+            raise KeyError(f"No existe la referencia ({u}, {v}).")
+        self.referencias[i, j] -= 1
+        self.referencias[j, i] -= 1
+        return self._refrescar(metodo, umbral_push, self._parchear_par(i, j))
+
+    def _parchear_par(self, i, j):
+        """
+        Recalcula en el sitio las filas i y j de P a partir de las aristas vigentes.
+        El cambio D es de rango bajo: su efecto alpha * D^T * y pasa al residuo.
+        Si solo cambian los pesos se reescriben los valores de las dos filas; si cambia
+        el patrón se desplazan una vez los arrays CSR. Devuelve el coste (entradas escritas).
+        """
+        indptr, indices, datos = self.P.indptr, self.P.indices, self.P.data
+        filas = {}
+        for u, otro in ((i, j), (j, i)):
+            ini, fin = indptr[u], indptr[u + 1]
+            antes = dict(zip(indices[ini:fin].tolist(), datos[ini:fin].tolist()))
+            vecinos = sorted(v for v in set(antes) | {otro} if (u, v) in self.jerarquia or self.referencias[u, v] > 0)
+            despues = {v: 1.0 / len(vecinos) for v in vecinos}
+            for v in set(antes) | set(despues):
+                self.residuo[v] += self.alpha * (despues.get(v, 0.0) - antes.get(v, 0.0)) * self.y[u]
+            filas[u] = despues
+            self.colgantes[u] = not vecinos
+
+        if all(list(filas[u]) == indices[indptr[u]:indptr[u + 1]].tolist() for u in filas):
+            for u, despues in filas.items():
+                datos[indptr[u]:indptr[u + 1]] = list(despues.values())
+            return sum(len(despues) for despues in filas.values())
+
+        # Cambia el patrón: se empalman las dos filas nuevas entre los tramos que no cambian
+        partes_indices, partes_datos, previo = [], [], 0
+        nuevo_indptr = indptr.copy()
+        for u in sorted(filas):
+            partes_indices += [indices[previo:indptr[u]], np.fromiter(filas[u], dtype=indices.dtype)]
+            partes_datos += [datos[previo:indptr[u]], np.fromiter(filas[u].values(), dtype=datos.dtype)]
+            nuevo_indptr[u + 1:] += len(filas[u]) - (indptr[u + 1] - indptr[u])
+            previo = indptr[u + 1]
+        partes_indices.append(indices[previo:])
+        partes_datos.append(datos[previo:])
+        self.P = sp.csr_matrix((np.concatenate(partes_datos), np.concatenate(partes_indices), nuevo_indptr),
+                               shape=self.P.shape)
+        self.PT = self.P.T
+        return self.P.nnz
+
+    def _refrescar(self, metodo, umbral_push, coste_parche=0):
+        """
+        Corrige el ranking con push si el residuo es pequeño, o con iteración en caliente.
+        coste_parche (entradas de P reescritas al cambiar referencias) cuenta en las operaciones.
+        """
+        if metodo == "auto":
+            relativo = np.abs(self.residuo).sum() / self.likes.sum()
+            metodo = "push" if relativo < umbral_push else "caliente"
+
+        if metodo == "push":
+            operaciones = self._push()
+            self.x = self.y / self.y.sum()
+            iteraciones = 0
+        else:
+            iteraciones = self._resolver_completo(x0=self.x)
+            operaciones = iteraciones * self.PT.nnz
+        operaciones += coste_parche
+
+        return {
+            "metodo": metodo,
+            "iteraciones": iteraciones,
+            "operaciones": operaciones,
+            "operaciones_completo": self.operaciones_completo,
+            "fraccion": operaciones / self.operaciones_completo,
+        }
+
+    def scores(self):
+        """Diccionario nodo -> score, igual que el que devuelve version4_personalizacion_likes."""
+        return dict(zip(self.nodos, self.x.tolist()))
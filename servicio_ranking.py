@@ -0,0 +1,311 @@
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, parse_qsl
+
+import numpy as np
+
+from cache_ranking import CacheRanking, huella_matriz, huella_personalizacion, VERSION_CACHE
+from consultas_ranking import RankingArbol
+from indice_arbol import indice_de
+from motor_pagerank import preparar_aristas, aristas_bidireccionales, vector_personalizacion, iteracion_potencia
+import demov5
+
+MAX_CUERPO = 1 << 20
+# Rankings base (versión, alpha) que se guardan a la vez; al pasarse se olvida el usado hace más tiempo
+MAX_RANKINGS = 32
+
+
+def _alpha(valor):
+    alpha = float(valor)
+    if not 0 < alpha < 1:
+        raise ValueError(f"alpha debe estar entre 0 y 1 (sin incluirlos): {valor}")
+    return alpha
+
+
+class ServicioRanking:
+    """
+    Estado del servicio: el grafo se lee una vez y las matrices de cada versión se
+    preparan una vez; los rankings base (con sus estructuras de top-k) se guardan
+    por (versión, alpha), como mucho MAX_RANKINGS. Los cálculos van a un pool de hilos
+    para no bloquear el bucle.
+
+    - v1: jerarquía sin pesos
+    - v3: libros y referencias con peso
+    - v4: jerarquía + referencias, personalizada por likes (los de demov5 o los de la petición)
+    Las personalizaciones ya resueltas se sirven desde una CacheRanking en memoria,
+    con clave (huella de la matriz v4, calculada una vez; alpha; huella de los likes).
+    """
+
+    def __init__(self, G, referencias, likes_libros, trabajadores=4, cache=None):
+        self.G = G
+        self.likes_libros = likes_libros
+        self.indice = indice_de(G)
+        self.pool = ThreadPoolExecutor(max_workers=trabajadores)
+        aristas = {
+            'v1': demov5.aristas_version1(G),
+            'v3': demov5.aristas_version3(G, referencias),
+            'v4': aristas_bidireccionales(G, referencias),
+        }
+        self.matrices = {}
+        for version, lista in aristas.items():
+            nodos, indice, PT, colgantes = preparar_aristas(G.nodes(), lista)
+            self.matrices[version] = (indice, PT, colgantes)
+        self.nodos = nodos
+        self._huella_v4 = huella_matriz(nodos, self.matrices['v4'][1])
+        self._rankings = OrderedDict()
+        self.cache = cache or CacheRanking(max_memoria=256)
+        # La caché se consulta desde los hilos del pool
+        self._cerrojo_cache = threading.Lock()
+        self.peticiones = 0
+
+    def _resolver(self, version, alpha, personalization=None):
+        """Scores como diccionario; se ejecuta en el pool."""
+        indice, PT, colgantes = self.matrices[version]
+        if version == 'v4' and personalization is None:
+            personalization = self.likes_libros
+        p = vector_personalizacion(indice, personalization) if personalization else None
+        x, _, _ = iteracion_potencia(PT, colgantes, alpha, p)
+        return dict(zip(self.nodos, x.tolist()))
+
+    def _personalizar(self, alpha, likes, k):
+        """Top-k de v4 con los likes dados, pasando por la caché; se ejecuta en el pool."""
+        clave = f"{VERSION_CACHE}:{self._huella_v4}:{alpha!r}:{huella_personalizacion(likes)}"
+        with self._cerrojo_cache:
+            pr = self.cache.obtener(clave)
+        if pr is None:
+            pr = self._resolver('v4', alpha, likes)
+            with self._cerrojo_cache:
+                self.cache.guardar(clave, pr)
+        # El diccionario sigue el orden de self.nodos: los k mayores sin ordenar todo
+        scores = np.fromiter(pr.values(), dtype=np.float64, count=len(pr))
+        k = min(k, len(scores))
+        if k <= 0:
+            return []
+        mejores = np.argpartition(-scores, k - 1)[:k]
+        mejores = mejores[np.lexsort((mejores, -scores[mejores]))]
+        return [(self.nodos[i], float(scores[i])) for i in mejores.tolist()]
+
+    async def ranking(self, version, alpha):
+        """RankingArbol base de (versión, alpha); peticiones simultáneas comparten el mismo cálculo."""
+        clave = (version, alpha)
+        if clave not in self._rankings:
+            loop = asyncio.get_running_loop()
+
+            def calcular():
+                return RankingArbol.desde_indice(self.indice, self._resolver(version, alpha))
+
+            self._rankings[clave] = loop.run_in_executor(self.pool, calcular)
+            while len(self._rankings) > MAX_RANKINGS:
+                self._rankings.popitem(last=False)
+        self._rankings.move_to_end(clave)
+        futuro = self._rankings[clave]
+        try:
+            return await futuro
+        except Exception:
+            # No se guarda un cálculo fallido
+            if self._rankings.get(clave) is futuro:
+                del self._rankings[clave]
+            raise
+
+    async def atender(self, ruta, parametros, cuerpo):
+        """Despacha una petición; devuelve (código HTTP, objeto JSON)."""
+        self.peticiones += 1
+        version = parametros.get('version', 'v1')
+        alpha = _alpha(parametros.get('alpha', 0.85))
+        if version not in self.matrices:
+            return 400, {'error': f"versión desconocida: {version}"}
+
+        if ruta == '/salud':
+            return 200, {'nodos': len(self.nodos), 'peticiones': self.peticiones, 'cache': self.cache.estadisticas()}
+
+        if ruta == '/rank':
+            ranking = await self.ranking(version, alpha)
+            nodo = parametros.get('nodo')
+            if nodo is not None:
+                if nodo not in ranking.id:
+                    return 404, {'error': f"nodo desconocido: {nodo}"}
+                return 200, {'nodo': nodo, 'score': float(ranking.scores[ranking.id[nodo]])}
+            return 200, {'scores': dict(zip(ranking.nodos, ranking.scores.tolist()))}
+
+        if ruta == '/topk':
+            ranking = await self.ranking(version, alpha)
+            nodo = parametros.get('nodo', self.nodos[int(self.indice.raices[0])])
+            k = int(parametros.get('k', 10))
+            if nodo not in ranking.id:
+                return 404, {'error': f"nodo desconocido: {nodo}"}
+            if parametros.get('tipo', 'hijos') == 'descendientes':
+                resultado = ranking.top_descendientes(nodo, k)
+            else:
+                resultado = ranking.top_hijos(nodo, k)
+            return 200, {'nodo': nodo, 'top': resultado}
+
+        if ruta == '/personalizar':
+            # Cuerpo JSON: {"likes": {nodo: likes}, "alpha": 0.85, "k": 10}
+            datos = json.loads(cuerpo or b"{}")
+            if not isinstance(datos, dict):
+                return 400, {'error': "el cuerpo debe ser un objeto JSON"}
+            likes = datos.get('likes') or self.likes_libros
+            if not isinstance(likes, dict) or not all(
+                    isinstance(valor, (int, float)) and not isinstance(valor, bool) for valor in likes.values()):
+                return 400, {'error': "likes debe ser un objeto {nodo: número}"}
+            alpha = _alpha(datos.get('alpha', alpha))
+            k = int(datos.get('k', 10))
+            indice = self.matrices['v4'][0]
+            if not any(nodo in indice and valor > 0 for nodo, valor in likes.items()):
+                return 400, {'error': "ningún nodo conocido tiene likes positivos"}
+            loop = asyncio.get_running_loop()
+            mejores = await loop.run_in_executor(self.pool, self._personalizar, alpha, likes, k)
+            return 200, {'top': mejores}
+
+        return 404, {'error': f"ruta desconocida: {ruta}"}
+
+
+# ============================================================================
+# HTTP mínimo sobre asyncio (una petición tras otra por conexión, keep-alive)
+# ============================================================================
+
+RAZONES = {200: "OK", 400: "Bad Request", 404: "Not Found"}
+
+
+async def _leer_peticion(lector):
+    """(método, objetivo, cabeceras, cuerpo) o None si el cliente cerró la conexión."""
+    linea = await lector.readline()
+    if not linea:
+        return None
+    metodo, objetivo, _ = linea.decode('latin-1').split(' ', 2)
+    cabeceras = {}
+    while True:
+        linea = await lector.readline()
+        if linea in (b"\r\n", b"\n", b""):
+            break
+        clave, _, valor = linea.decode('latin-1').partition(':')
+        cabeceras[clave.strip().lower()] = valor.strip()
+    largo = int(cabeceras.get('content-length', 0))
+    if largo > MAX_CUERPO:
+        raise ValueError("cuerpo demasiado grande")
+    cuerpo = await lector.readexactly(largo) if largo else b""
+    return metodo, objetivo, cabeceras, cuerpo
+
+
+def _respuesta(codigo, objeto, mantener):
+    cuerpo = json.dumps(objeto, ensure_ascii=False).encode('utf-8')
+    cabecera = (f"HTTP/1.1 {codigo} {RAZONES.get(codigo, '')}\r\n"
+                f"Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(cuerpo)}\r\n"
+                f"Connection: {'keep-alive' if mantener else 'close'}\r\n\r\n")
+    return cabecera.encode('latin-1') + cuerpo
+
+
+async def servir(servicio, host="127.0.0.1", puerto=8765):
+    async def conexion(lector, escritor):
+        try:
+            while True:
+                try:
+                    peticion = await _leer_peticion(lector)
+                except (ValueError, asyncio.IncompleteReadError):
+                    escritor.write(_respuesta(400, {'error': "petición inválida"}, False))
+                    break
+                if peticion is None:
+                    break
+                _, objetivo, cabeceras, cuerpo = peticion
+                partes = urlsplit(objetivo)
+                try:
+                    codigo, objeto = await servicio.atender(partes.path, dict(parse_qsl(partes.query)), cuerpo)
+                except (ValueError, KeyError, TypeError, RuntimeError) as e:
+                    codigo, objeto = 400, {'error': str(e)}
+                mantener = cabeceras.get('connection', '').lower() != 'close'
+                escritor.write(_respuesta(codigo, objeto, mantener))
+                await escritor.drain()
+                if not mantener:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            escritor.close()
+
+    servidor = await asyncio.start_server(conexion, host, puerto)
+    print(f"Servicio de ranking en http://{host}:{puerto} ({len(servicio.nodos)} nodos)")
+    async with servidor:
+        await servidor.serve_forever()
+
+
+# ============================================================================
+# CLIENTE DE BENCHMARK
+# ============================================================================
+
+async def _cliente(host, puerto, rutas, latencias):
+    lector, escritor = await asyncio.open_connection(host, puerto)
+    for ruta in rutas:
+        t0 = time.perf_counter()
+        escritor.write(f"GET {ruta} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode('latin-1'))
+        await escritor.drain()
+        largo = 0
+        while True:
+            linea = await lector.readline()
+            if linea in (b"\r\n", b""):
+                break
+            if linea.lower().startswith(b"content-length:"):
+                largo = int(linea.split(b":")[1])
+        await lector.readexactly(largo)
+        latencias.append(time.perf_counter() - t0)
+    escritor.close()
+
+
+async def benchmark(host="127.0.0.1", puerto=8765, peticiones=2000, concurrencia=16, nodos=None):
+    """
+    Lanza peticiones mezcladas (top-k de hijos y descendientes, score de un nodo)
+    desde varias conexiones a la vez y devuelve percentiles de latencia en ms.
+    """
+    nodos = nodos or ["Mystery", "Thriller", "Crime", "Historical fiction"]
+    rutas = []
+    for _ in range(peticiones):
+        version = random.choice(["v1", "v3", "v4"])
+        nodo = random.choice(nodos).replace(" ", "%20")
+        rutas.append(random.choice([
+            f"/topk?version={version}&nodo={nodo}&k=5",
+            f"/topk?version={version}&nodo={nodo}&k=5&tipo=descendientes",
+            f"/rank?version={version}&nodo={nodo}",
+        ]))
+
+    latencias = []
+    t0 = time.perf_counter()
+    await asyncio.gather(*(_cliente(host, puerto, rutas[i::concurrencia], latencias) for i in range(concurrencia)))
+    segundos = time.perf_counter() - t0
+
+    ms = np.array(latencias) * 1000
+    return {
+        'peticiones': len(latencias),
+        'concurrencia': concurrencia,
+        'segundos': segundos,
+        'peticiones_por_segundo': len(latencias) / segundos,
+        'p50_ms': float(np.percentile(ms, 50)),
+        'p90_ms': float(np.percentile(ms, 90)),
+        'p99_ms': float(np.percentile(ms, 99)),
+        'max_ms': float(ms.max()),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servicio local de ranking (y su cliente de benchmark)")
+    parser.add_argument("modo", choices=["servir", "benchmark"], nargs="?", default="servir")
+    parser.add_argument("--entrada", default=demov5.ENTRADA, help="taxonomía a servir (formato de entrada.txt)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8765)
+    parser.add_argument("--trabajadores", type=int, default=4)
+    parser.add_argument("--peticiones", type=int, default=2000)
+    parser.add_argument("--concurrencia", type=int, default=16)
+    args = parser.parse_args()
+
+    if args.modo == "servir":
+        servicio = ServicioRanking(demov5.cargar_grafo(args.entrada), demov5.referencias, demov5.likes_libros,
+                                   args.trabajadores)
+        asyncio.run(servir(servicio, args.host, args.puerto))
+    else:
+        stats = asyncio.run(benchmark(args.host, args.puerto, args.peticiones, args.concurrencia))
+        print(json.dumps(stats, indent=2))
@@ -0,0 +1,266 @@
+import hashlib
+import math
+from collections import OrderedDict
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.csgraph import breadth_first_order, connected_components
+
+from instrumentacion import instrumentar, registrar_calculo
+
+# Cada cuántas iteraciones se intenta extrapolar
+PERIODO_EXTRAPOLACION = 10
+# Coloreados recientes por estructura de la matriz (ver grupos_de)
+MAX_COLOREADOS = 16
+_coloreados = OrderedDict()
+
+
+def colorear(PT):
+    """
+    Coloreado del grafo sin dirección de PT: dos nodos vecinos nunca comparten color.
+    Se parte de la paridad de la profundidad en un árbol BFS (2 colores, exacto en un
+    árbol) y solo los nodos de las aristas que quedan en conflicto (referencias, ciclos
+    impares) se recolorean uno a uno. Devuelve la lista de grupos (arrays de ids), uno por color.
+    """
+    n = PT.shape[0]
+    if n == 0:
+        return []
+    S = (PT + PT.T).tocsr()
+    _, etiquetas = connected_components(S, directed=False)
+    raices = np.unique(etiquetas, return_index=True)[1]
+
+    # Un nodo extra (n) unido a una raíz por componente: un único BFS recorre todo el grafo
+    enlaces = sp.csr_matrix((np.ones(len(raices)), (np.full(len(raices), n), raices)), shape=(n + 1, n + 1))
+    _, predecesor = breadth_first_order(sp.block_diag((S, sp.csr_matrix((1, 1)))).tocsr() + enlaces, n,
+                                        directed=False)
+    # Profundidad por saltos de puntero
+    padre = predecesor.astype(np.int64)
+    padre[n] = n
+    profundidad = np.ones(n + 1, dtype=np.int64)
+    profundidad[n] = 0
+    while np.any(padre != n):
+        profundidad += profundidad[padre]
+        padre = padre[padre]
+    color = profundidad[:n] % 2
+
+    # Aristas con los dos extremos del mismo color: se recolorea uno de ellos, de forma voraz
+    coo = S.tocoo()
+    conflicto = (coo.row < coo.col) & (color[coo.row] == color[coo.col])
+    if np.any(conflicto):
+        indptr, indices = S.indptr, S.indices
+        for v in np.unique(coo.row[conflicto]).tolist():
+            vecinos = indices[indptr[v]:indptr[v + 1]]
+            usados = set(color[vecinos[vecinos != v]].tolist())
+            c = 0
+            while c in usados:
+                c += 1
+            color[v] = c
+    return [np.flatnonzero(color == c) for c in range(color.max() + 1)]
+
+
+def grupos_de(PT):
+    """
+    colorear(PT) guardado por estructura de la matriz (forma e índices, no pesos): las
+    llamadas siguientes con la misma matriz, aunque se haya vuelto a construir, solo la hashean.
+    """
+    h = hashlib.sha1(repr(PT.shape).encode())
+    h.update(np.ascontiguousarray(PT.indptr).tobytes())
+    h.update(np.ascontiguousarray(PT.indices).tobytes())
+    clave = h.hexdigest()
+    if clave in _coloreados:
+        _coloreados.move_to_end(clave)
+        return _coloreados[clave]
+    grupos = colorear(PT)
+    _coloreados[clave] = grupos
+    while len(_coloreados) > MAX_COLOREADOS:
+        _coloreados.popitem(last=False)
+    return grupos
+
+
+def _paso(PT, colgantes, alpha, p, y):
+    """Un paso de la iteración de potencias desde x = y normalizado: devuelve (G x, ||G x - x||_1)."""
+    x = y / y.sum()
+    gx = alpha * (PT @ x + x[colgantes].sum() * p) + (1 - alpha) * p
+    return gx, float(np.abs(gx - x).sum())
+
+
+def _residuo(PT, colgantes, alpha, p, y):
+    """||G x - x||_1 con x = y normalizado y G la matriz de Google (mismo p para los nodos sin salida)."""
+    return _paso(PT, colgantes, alpha, p, y)[1]
+
+
+def _residuo_lineal(PT, alpha, p, y):
+    """||(I - alpha*PT) y - p||_1: a diferencia de _residuo, también mide la escala de y."""
+    return float(np.abs(y - alpha * (PT @ y) - p).sum())
+
+
+def _aitken(y0, y1, y2):
+    """Extrapolación Δ² de Aitken componente a componente."""
+    d1 = y2 - y1
+    d2 = y2 - 2 * y1 + y0
+    seguro = np.abs(d2) > 1e-14 * np.abs(y2).max()
+    z = y2.copy()
+    z[seguro] -= d1[seguro] ** 2 / d2[seguro]
+    return z
+
+
+def _cuadratica(y0, y1, y2, y3):
+    """Extrapolación cuadrática (Kamvar et al.) con las cuatro últimas iteraciones."""
+    Y = np.column_stack((y1 - y0, y2 - y0))
+    gamma, *_ = np.linalg.lstsq(Y, -(y3 - y0), rcond=None)
+    g1, g2, g3 = gamma[0], gamma[1], 1.0
+    return (g1 + g2 + g3) * y1 + (g2 + g3) * y2 + g3 * y3
+
+
+def _top(x, k):
+    k = min(k, len(x))
+    candidatos = np.argpartition(-x, k - 1)[:k]
+    return candidatos[np.argsort(-x[candidatos], kind="stable")]
+
+
+@instrumentar()
+def iteracion_acelerada(PT, colgantes, alpha=0.85, p=None, x0=None, metodo="gauss_seidel", extrapolacion="aitken",
+                        parada="residuo", tol=1.0e-6, tol_adaptativa=False, top_k=10, estable=3, max_iter=1000,
+                        comparar=False, grupos=None):
+    """
+    PageRank con control del método y de la parada. Resuelve (I - alpha*PT) y = p
+    (los nodos sin salida reparten según p, como nx.pagerank) y devuelve x = y / suma(y).
+
+    - metodo: "potencia" o "gauss_seidel" (barridos por colores, ver grupos_de;
+      grupos permite pasar un coloreado ya hecho)
+    - extrapolacion: None, "aitken" o "cuadratica"; cada PERIODO_EXTRAPOLACION
+      iteraciones, y solo se acepta si baja el residuo
+    - parada "residuo": la cota del error en L1 del vector devuelto, residuo/(1-alpha) con
+      residuo = ||G x - x||_1, baja de n*tol; es la misma para todos los métodos, así que
+      todos dan al menos esa precisión (con la iteración de potencias el residuo es el
+      cambio del paso siguiente). Con tol_adaptativa la cota se cambia por el error estimado
+      cambio*rho/(1-rho), con rho la velocidad de convergencia medida, solo cuando sus
+      'estable' últimas estimaciones coinciden
+    - parada "top_k": el orden de los top_k primeros no cambia en 'estable' iteraciones
+    Devuelve x y un diccionario con iteraciones, residuo final y las iteraciones que
+    ahorra frente a la iteración de potencias simple con el mismo criterio (estimadas
+    por su cota alpha^k, o exactas con comparar=True, que repite el cálculo sin acelerar;
+    None si no se pueden saber: parada top_k sin comparar, o si la otra no converge).
+    """
+    n = PT.shape[0]
+    p = np.full(n, 1.0 / n) if p is None else p
+    x = np.full(n, 1.0 / n) if x0 is None else np.asarray(x0, dtype=np.float64) / np.sum(x0)
+    objetivo = n * tol
+
+    # Residuo del vector inicial: base de la estimación de las iteraciones de potencias
+    gx, residuo_inicial = _paso(PT, colgantes, alpha, p, x)
+
+    if metodo == "gauss_seidel":
+        grupos = grupos if grupos is not None else grupos_de(PT)
+        diagonal = PT.diagonal()
+        bloques = [(g, PT[g], 1.0 - alpha * diagonal[g], diagonal[g]) for g in grupos]
+        y = x / (1 - alpha)
+
+        def medir(y):
+            return _residuo_lineal(PT, alpha, p, y)
+
+        def iterar(y, gx):
+            y = y.copy()
+            for g, filas, divisor, d in bloques:
+                y[g] = (p[g] + alpha * (filas @ y - d * y[g])) / divisor
+            return y
+    elif metodo == "potencia":
+        y = x
+
+        def medir(y):
+            return _residuo(PT, colgantes, alpha, p, y)
+
+        def iterar(y, gx):
+            # G x ya está calculado al medir el residuo de la iteración anterior
+            return gx
+    else:
+        raise ValueError(f"método desconocido: {metodo}")
+
+    historial = [y]
+    cambios = []
+    orden_previo, repeticiones = None, 0
+    extrapolaciones, ultima_extrapolacion = 0, -estable - 2
+    convergido = False
+
+    for iteracion in range(1, max_iter + 1):
+        y = iterar(y, gx)
+        if extrapolacion and iteracion % PERIODO_EXTRAPOLACION == 0 and len(historial) >= 3:
+            if extrapolacion == "aitken":
+                z = _aitken(historial[-2], historial[-1], y)
+            else:
+                z = _cuadratica(historial[-3], historial[-2], historial[-1], y)
+            z = np.maximum(z, 0.0)
+            if z.sum() > 0 and medir(z) < medir(y):
+                y = z
+                extrapolaciones += 1
+                ultima_extrapolacion = iteracion
+        historial = historial[-3:] + [y]
+
+        x_nuevo = y / y.sum()
+        cambios.append(float(np.abs(x_nuevo - x).sum()))
+        x = x_nuevo
+        gx, residuo = _paso(PT, colgantes, alpha, p, y)
+
+        if parada == "top_k":
+            orden = _top(x, top_k)
+            repeticiones = repeticiones + 1 if orden_previo is not None and np.array_equal(orden, orden_previo) else 0
+            orden_previo = orden
+            convergido = repeticiones >= estable
+        else:
+            if tol_adaptativa:
+                error = _error_estimado(cambios, residuo, alpha, estable, iteracion - ultima_extrapolacion)
+            else:
+                error = residuo / (1 - alpha)
+            convergido = error < objetivo
+        if convergido:
+            break
+
+    if not convergido:
+        raise RuntimeError(f"PageRank no converge en {max_iter} iteraciones (residuo {residuo:.2e}).")
+
+    if comparar:
+        try:
+            _, base = iteracion_acelerada(PT, colgantes, alpha, p, x0, metodo="potencia", extrapolacion=None,
+                                          parada=parada, tol=tol, tol_adaptativa=tol_adaptativa, top_k=top_k,
+                                          estable=estable, max_iter=max_iter)
+            iteraciones_potencia = base["iteraciones"]
+        except RuntimeError:
+            iteraciones_potencia = None
+    elif parada == "residuo":
+        # La iteración simple reduce el residuo como mínimo en un factor alpha por paso
+        cota = residuo_inicial / (1 - alpha)
+        iteraciones_potencia = 0 if cota < objetivo else math.ceil(math.log(objetivo / cota) / math.log(alpha))
+    else:
+        # Sin cota para la parada top_k: solo se compara con comparar=True
+        iteraciones_potencia = None
+
+    info = {
+        "metodo": metodo,
+        "extrapolacion": extrapolacion,
+        "parada": parada,
+        "iteraciones": iteracion,
+        "extrapolaciones": extrapolaciones,
+        "residuo": residuo,
+        "iteraciones_potencia": iteraciones_potencia,
+        "iteraciones_ahorradas": None if iteraciones_potencia is None else iteraciones_potencia - iteracion,
+        "potencia_exacta": comparar,
+    }
+    registrar_calculo(f"acelerado/{metodo}", n, iteracion, residuo, alpha=alpha,
+                      ahorradas=info["iteraciones_ahorradas"])
+    return x, info
+
+
+def _error_estimado(cambios, residuo, alpha, estable, desde_extrapolacion):
+    """
+    Error estimado del vector actual. rho (cambio_k / cambio_{k-1}) solo se usa si sus
+    'estable' últimas estimaciones, sin una extrapolación por medio, coinciden en un 10%,
+    y nunca da menos que el residuo; si no, la cota residuo / (1 - alpha).
+    """
+    if desde_extrapolacion > estable + 1 and len(cambios) > estable:
+        ultimos = np.array(cambios[-estable - 1:])
+        if np.all(ultimos[:-1] > 0):
+            rhos = ultimos[1:] / ultimos[:-1]
+            rho = rhos.max()
+            if rho < 1 and rhos.max() - rhos.min() <= 0.1 * rho:
+                return max(cambios[-1] * rho / (1 - rho), residuo)
+    return residuo / (1 - alpha)
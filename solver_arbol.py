@@ -0,0 +1,138 @@
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse import csgraph
+
+from instrumentacion import activo, instrumentar, registrar_calculo
+
+# Máximo de columnas de corrección (extremos de referencias) antes de volver a la iteración de potencias
+MAX_CORRECCIONES = 64
+
+
+def bosque_generador(PT):
+    """
+    Elige un bosque generador del grafo (sin dirección) con un BFS desde una raíz virtual.
+    Devuelve el array de padres (-1 en las raíces) y los niveles del BFS, de la raíz a las hojas.
+    """
+    n = PT.shape[0]
+    simetrica = (PT + PT.T).tocsr()
+
+    # Raíz virtual n conectada con un nodo de cada componente
+    _, etiquetas = csgraph.connected_components(simetrica, directed=False)
+    _, primeros = np.unique(etiquetas, return_index=True)
+    extra = sp.csr_matrix((np.ones(len(primeros)), (np.full(len(primeros), n), primeros)), shape=(n + 1, n + 1))
+    ampliada = sp.bmat([[simetrica, None], [None, sp.csr_matrix((1, 1))]]).tocsr() + extra
+
+    _, predecesores = csgraph.breadth_first_order(ampliada, n, directed=False, return_predecessors=True)
+    padre = predecesores[:n].astype(np.int64)
+    padre[padre == n] = -1
+
+    # Niveles: se expanden los hijos de cada frontera
+    orden = np.argsort(padre, kind="stable")
+    inicio = np.searchsorted(padre[orden], np.arange(-1, n + 1))
+    niveles = []
+    frontera = orden[inicio[0]:inicio[1]]
+    while len(frontera):
+        niveles.append(frontera)
+        ini, fin = inicio[frontera + 1], inicio[frontera + 2]
+        largos = fin - ini
+        posiciones = np.repeat(ini - np.cumsum(largos) + largos, largos) + np.arange(largos.sum())
+        frontera = orden[posiciones]
+    return padre, niveles
+
+
+def _cerrar_hacia_raiz(padre, nodos):
+    """Máscara de nodos y todos sus ancestros en el bosque padre."""
+    marcado = np.zeros(len(padre), dtype=bool)
+    frontera = np.unique(nodos)
+    while len(frontera):
+        marcado[frontera] = True
+        frontera = np.unique(padre[frontera])
+        frontera = frontera[(frontera >= 0) & ~marcado[np.maximum(frontera, 0)]]
+    return marcado
+
+
+def _resolver_bosque(B, nodos, grupos, padre_local, D, a_cq, factor):
+    """
+    Resuelve M_arbol Y = B sobre nodos (cerrados hacia la raíz), con D ya eliminada.
+    B tiene una fila por nodo; grupos son los niveles del BFS en posiciones de nodos
+    y padre_local el padre de cada uno en esas posiciones.
+    """
+    B = B.copy()
+    # Eliminación de las hojas hacia la raíz
+    for nivel in reversed(grupos[1:]):
+        np.subtract.at(B, padre_local[nivel], factor[nodos[nivel], None] * B[nivel])
+
+    # Sustitución de la raíz hacia las hojas
+    Y = np.empty_like(B)
+    Y[grupos[0]] = B[grupos[0]] / D[nodos[grupos[0]], None]
+    for nivel in grupos[1:]:
+        Y[nivel] = (B[nivel] - a_cq[nodos[nivel], None] * Y[padre_local[nivel]]) / D[nodos[nivel], None]
+    return Y
+
+
+@instrumentar()
+def resolver_arbol(PT, alpha, p, max_correcciones=MAX_CORRECCIONES):
+    """
+    PageRank exacto para un árbol bidireccional con pocas aristas extra (referencias).
+
+    El PageRank es proporcional a y, con (I - alpha*PT) y = p. Sobre el bosque
+    generador el sistema se resuelve sin relleno: eliminación de hojas a raíz y
+    sustitución de raíz a hojas, ambas vectorizadas por niveles. El resto de
+    aristas forma una corrección de rango bajo que se resuelve con Woodbury.
+    Las s columnas de la corrección solo se resuelven sobre los caminos a la raíz
+    de sus nodos (T nodos): el coste es O(n + T*s + s^3), con T <= s * profundidad,
+    en lugar de un bloque denso n x s. Devuelve None si s > max_correcciones.
+    """
+    n = PT.shape[0]
+    padre, niveles = bosque_generador(PT)
+
+    coo = PT.tocoo()
+    filas, columnas, valores = coo.row, coo.col, -alpha * coo.data
+    diagonal = filas == columnas
+    hacia_padre = (padre[filas] == columnas) & ~diagonal    # M[c, padre(c)]
+    desde_padre = (padre[columnas] == filas) & ~diagonal    # M[padre(c), c]
+    resto = ~(diagonal | hacia_padre | desde_padre)
+
+    S = np.unique(columnas[resto])
+    if len(S) > max_correcciones:
+        return None
+
+    D = 1.0 + np.bincount(filas[diagonal], weights=valores[diagonal], minlength=n)
+    a_cq = np.bincount(filas[hacia_padre], weights=valores[hacia_padre], minlength=n)
+    a_qc = np.bincount(columnas[desde_padre], weights=valores[desde_padre], minlength=n)
+
+    # Eliminación de D de las hojas a la raíz; no depende del lado derecho
+    factor = np.zeros(n)
+    for nivel in reversed(niveles[1:]):
+        factor[nivel] = a_qc[nivel] / D[nivel]
+        np.subtract.at(D, padre[nivel], factor[nivel] * a_cq[nivel])
+
+    def resolver(b):
+        return _resolver_bosque(b[:, None], np.arange(n), niveles, padre, D, a_cq, factor)[:, 0]
+
+    z = resolver(p)
+    if len(S):
+        # Columnas de la corrección C = M - M_arbol, resueltas solo sobre los ancestros de sus nodos
+        nodos = np.flatnonzero(_cerrar_hacia_raiz(padre, np.concatenate((S, filas[resto]))))
+        local = np.full(n, -1, dtype=np.int64)
+        local[nodos] = np.arange(len(nodos))
+        padre_local = np.where(padre[nodos] >= 0, local[np.maximum(padre[nodos], 0)], -1)
+        nivel_de = np.empty(n, dtype=np.int64)
+        for k, nivel in enumerate(niveles):
+            nivel_de[nivel] = k
+        orden = np.argsort(nivel_de[nodos], kind="stable")
+        grupos = np.split(orden, np.flatnonzero(np.diff(nivel_de[nodos][orden])) + 1)
+
+        posicion = np.searchsorted(S, columnas[resto])
+        U = np.zeros((len(nodos), len(S)))
+        np.add.at(U, (local[filas[resto]], posicion), valores[resto])
+        ZS = _resolver_bosque(U, nodos, grupos, padre_local, D, a_cq, factor)[local[S]]
+
+        # Woodbury: (M_arbol + U E_S^T)^-1 p = M_arbol^-1 (p - U w), con (I + Z[S]) w = z[S]
+        w = np.linalg.solve(np.eye(len(S)) + ZS, z[S])
+        z = resolver(p - np.bincount(filas[resto], weights=valores[resto] * w[posicion], minlength=n))
+    if activo():
+        # Residuo del sistema (I - alpha*PT) z = p; solo se calcula con la instrumentación activa
+        registrar_calculo("arbol", n, 0, float(np.abs(z - alpha * (PT @ z) - p).sum()),
+                          alpha=alpha, correcciones=len(S))
+    return z / z.sum()